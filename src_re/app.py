@@ -456,22 +456,23 @@ def generate_demo_outline() -> Any:
         if not current_session:
             current_session = uuid_manager.check_uuid()
         
-        # Create new record
-        current_session.create_record()
-        
-        # If topic is provided, save it to the record
-        if "topic" in json_data:
-            topic = json_data.get("topic", "")
-            # Use uuid_manager method to save topic
-            uuid_manager.save_topic_to_current_pos(topic)
-        
-        # Directly save preset outline to history record
         outline_content = json_data.get("outline", "")
         from utils.ArticleTextProcessing import ArticleTextProcessing
         cleaned_outline = ArticleTextProcessing.clean_up_outline(outline_content, json_data.get("topic", ""))
         
-        # Use uuid_manager method to save outline
-        success = uuid_manager.save_outline_to_current_pos(cleaned_outline)
+        # Create the record and save topic and outline in one transaction
+        with current_session.transaction():
+            # Create new record
+            current_session.create_record()
+            
+            # If topic is provided, save it to the record
+            if "topic" in json_data:
+                topic = json_data.get("topic", "")
+                # Use uuid_manager method to save topic
+                uuid_manager.save_topic_to_current_pos(topic)
+            
+            # Directly save preset outline to history record
+            success = uuid_manager.save_outline_to_current_pos(cleaned_outline)
         if not success:
             logging.error("Failed to save demo outline")
             return jsonify({'error': 'Failed to save demo outline'}), 500
@@ -614,9 +615,10 @@ def save_outline_to_session():
                 total_records = 0
 
             if pos == total_records:
-                # Append mode: create new record then write
-                current_session.create_record()
-                success = current_session.update_record_outline(pos, outline_content)
+                # Append mode: create new record then write, committed together
+                with current_session.transaction():
+                    current_session.create_record()
+                    success = current_session.update_record_outline(pos, outline_content)
             elif 0 <= pos < total_records:
                 success = current_session.update_record_outline(pos, outline_content)
             else:
@@ -779,9 +781,13 @@ def save_article_to_session():
             if is_valid_format:
                 logging.info("References format is valid, saving directly")
                 if pos is not None:
-                    references_saved = current_session.update_record_references(pos, references)
+                    references_saved = current_session.update_record_references(
+                        pos, references, format_hint="chapter_indexed"
+                    )
                 else:
-                    references_saved = uuid_manager.save_references_to_current_pos(references)
+                    references_saved = uuid_manager.save_references_to_current_pos(
+                        references, format_hint="chapter_indexed"
+                    )
             else:
                 logging.warning("References format is not valid, attempting to save anyway")
                 if pos is not None:
@@ -126,8 +126,8 @@ class ArticleRouter:
             
             # Initialize article list from session or create new one
             current_articles = self.user_session.get_record_articles(self.pos)
-            if current_articles is None:
-                current_articles = []
+            # Work on a mutable copy; changes are written back via update_record_articles
+            current_articles = list(current_articles or [])
             
             # Ensure the list length matches the number of chapters
             while len(current_articles) < len(chapters):
@@ -275,8 +275,8 @@ class ArticleRouter:
             
             # Initialize article list
             current_articles = self.user_session.get_record_articles(self.pos)
-            if current_articles is None:
-                current_articles = []
+            # Work on a mutable copy; changes are written back via update_record_articles
+            current_articles = list(current_articles or [])
             
             # Ensure the list length is sufficient
             while len(current_articles) < len(chapters):
@@ -426,8 +426,8 @@ class ArticleRouter:
                 
                 # Get the current article list
                 current_articles = self.user_session.get_record_articles(self.pos)
-                if current_articles is None:
-                    current_articles = []
+                # Work on a mutable copy; changes are written back via update_record_articles
+                current_articles = list(current_articles or [])
                 
                 # Ensure the list length is sufficient
                 while len(current_articles) <= chapter_index:
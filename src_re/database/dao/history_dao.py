@@ -1,19 +1,93 @@
 from __future__ import annotations
 
+import json
 import logging
 import uuid as uuid_lib
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 
-from sqlalchemy import and_, func, desc
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, func, text, exists
+from sqlalchemy.types import JSON
+from sqlalchemy.orm import Session, load_only
 from sqlalchemy.exc import IntegrityError
 
-from database.models import HistoryRecordDB, ConversationMessageDB, OutlineHistoryDB, ArticleHistoryDB
+from database.models import HistoryRecordDB, ConversationMessageDB, OutlineHistoryDB, ArticleHistoryDB, UserSessionDB
 
 
 logger = logging.getLogger(__name__)
 
+# Insert a record, make it the session's current record and trim the oldest ones in one statement.
+# All CTEs see the snapshot taken before the INSERT, so the new row is not counted by the DELETE.
+_CREATE_AND_SET_CURRENT_SQL = text("""
+    WITH ins AS (
+        INSERT INTO history_records (
+            session_uuid, record_position, outline, article_chapters, references_data,
+            next_message_order, created_at, updated_at
+        )
+        VALUES (:session_uuid, :record_position, '', '[]'::json, '{}'::json, 1, :now, :now)
+        RETURNING id, created_at
+    ), upd AS (
+        UPDATE user_sessions
+        SET current_record_id = (SELECT id FROM ins), lock_version = lock_version + 1, updated_at = :now
+        WHERE uuid = :session_uuid
+    ), del AS (
+        DELETE FROM history_records
+        WHERE id IN (
+            SELECT id FROM history_records
+            WHERE session_uuid = :session_uuid
+            ORDER BY created_at DESC, id DESC
+            OFFSET GREATEST(:max_records - 1, 0)
+        )
+        RETURNING id
+    )
+    SELECT ins.id, ins.created_at, (SELECT count(*) FROM del) AS deleted_count
+    FROM ins
+""")
+
+# Record summaries in position order (same ordering as get_session_records); only
+# the heads of topic/outline are transferred, one character past the preview length
+_RECORDS_SUMMARY_SQL = text("""
+    SELECT
+        hr.id,
+        row_number() OVER (ORDER BY hr.created_at ASC, hr.id ASC) - 1 AS position,
+        hr.created_at,
+        hr.updated_at,
+        COALESCE(hr.outline, '') <> '' AS has_outline,
+        COALESCE(hr.topic, '') <> '' AS has_topic,
+        left(COALESCE(hr.topic, ''), 51) AS topic_head,
+        left(COALESCE(hr.outline, ''), 101) AS outline_head,
+        CASE WHEN json_typeof(hr.article_chapters) = 'array'
+             THEN json_array_length(hr.article_chapters) ELSE 0 END AS article_count,
+        COALESCE(hr.id = COALESCE(CAST(:current_record_id AS integer), us.current_record_id), false) AS is_current
+    FROM history_records hr
+    LEFT JOIN user_sessions us ON us.uuid = hr.session_uuid
+    WHERE hr.session_uuid = :session_uuid
+    ORDER BY hr.created_at ASC, hr.id ASC
+""")
+
+# Built once at import; the JSON bind type serializes the dict for the driver
+_UPDATE_REFERENCES_SQL = text("""
+    UPDATE history_records SET references_data = :references, updated_at = :now
+    WHERE id = :record_id
+""").bindparams(bindparam("references", type_=JSON))
+
+# Server-side edits of the JSON columns; only the new data goes over the wire
+_APPEND_ARTICLES_SQL = text("""
+    UPDATE history_records
+    SET article_chapters = (COALESCE(article_chapters::jsonb, '[]'::jsonb) || CAST(:chapters AS jsonb))::json,
+        updated_at = :now
+    WHERE id = :record_id
+""")
+
+_SET_CHAPTER_REFERENCES_SQL = text("""
+    UPDATE history_records
+    SET references_data = jsonb_set(
+            COALESCE(references_data::jsonb, '{}'::jsonb), ARRAY[CAST(:chapter_key AS text)], CAST(:chapter_references AS jsonb)
+        )::json,
+        updated_at = :now
+    WHERE id = :record_id
+""")
+
 
 class HistoryDAO:
     """History data access object
@@ -39,6 +113,24 @@ class HistoryDAO:
         logger.info(f"Created history record: session={session_uuid}, id={record.id}")
         return record
 
+    @staticmethod
+    def create_and_set_current(session: Session, session_uuid: str, record_position: Optional[int],
+                               max_records: int) -> Tuple[int, datetime, int]:
+        """Create a record, set it as the session's current record and clean up old records
+        
+        Single-round-trip equivalent of create_history_record + SessionDAO.update_current_record
+        + cleanup_old_records. Returns (record_id, created_at, deleted_count).
+        """
+        row = session.execute(_CREATE_AND_SET_CURRENT_SQL, {
+            "session_uuid": session_uuid,
+            "record_position": record_position,
+            "max_records": max_records,
+            "now": datetime.utcnow(),
+        }).one()
+        
+        logger.info(f"Created history record: session={session_uuid}, id={row.id}, cleaned={row.deleted_count}")
+        return row.id, row.created_at, row.deleted_count
+
     @staticmethod
     def get_history_record(session: Session, record_id: int) -> Optional[HistoryRecordDB]:
         """Get history record by ID"""
@@ -51,13 +143,84 @@ class HistoryDAO:
         """Get all history records of a session"""
         query = session.query(HistoryRecordDB).filter(
             HistoryRecordDB.session_uuid == session_uuid
-        ).order_by(HistoryRecordDB.created_at.asc())
+        ).order_by(HistoryRecordDB.created_at.asc(), HistoryRecordDB.id.asc())
         
         if limit:
             query = query.limit(limit)
             
         return query.all()
 
+    @staticmethod
+    def get_session_records_light(session: Session, session_uuid: str, limit: Optional[int] = None) -> List[HistoryRecordDB]:
+        """Get history records of a session without the article/references JSON columns
+        
+        Same ordering as get_session_records; use get_record_content to fetch the
+        omitted columns of a single record.
+        """
+        query = session.query(HistoryRecordDB).options(
+            load_only(
+                HistoryRecordDB.id,
+                HistoryRecordDB.session_uuid,
+                HistoryRecordDB.record_position,
+                HistoryRecordDB.topic,
+                HistoryRecordDB.outline,
+                HistoryRecordDB.created_at,
+            )
+        ).filter(
+            HistoryRecordDB.session_uuid == session_uuid
+        ).order_by(HistoryRecordDB.created_at.asc(), HistoryRecordDB.id.asc())
+        
+        if limit:
+            query = query.limit(limit)
+            
+        return query.all()
+
+    @staticmethod
+    def get_record_content(session: Session, record_id: int) -> Optional[Tuple[Any, Any]]:
+        """Get (article_chapters, references_data) of a record"""
+        row = session.query(
+            HistoryRecordDB.article_chapters, HistoryRecordDB.references_data
+        ).filter(
+            HistoryRecordDB.id == record_id
+        ).first()
+        return (row.article_chapters, row.references_data) if row else None
+
+    @staticmethod
+    def session_has_records(session: Session, session_uuid: str) -> bool:
+        """Check whether a session has any history records"""
+        return bool(session.query(
+            exists().where(HistoryRecordDB.session_uuid == session_uuid)
+        ).scalar())
+
+    @staticmethod
+    def get_record_position(session: Session, session_uuid: str, record_id: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """Get (record_id, position) of a record within its session in one query
+        
+        Position follows the same ordering as get_session_records. When record_id
+        is None, the session's current record is resolved from user_sessions in
+        the same statement.
+        """
+        ranked = session.query(
+            HistoryRecordDB.id.label("id"),
+            (func.row_number().over(
+                order_by=(HistoryRecordDB.created_at.asc(), HistoryRecordDB.id.asc())
+            ) - 1).label("position"),
+        ).filter(
+            HistoryRecordDB.session_uuid == session_uuid
+        ).subquery()
+        
+        if record_id is None:
+            target = session.query(UserSessionDB.current_record_id).filter(
+                UserSessionDB.uuid == session_uuid
+            ).scalar_subquery()
+        else:
+            target = record_id
+        
+        row = session.query(ranked.c.id, ranked.c.position).filter(
+            ranked.c.id == target
+        ).first()
+        return (row.id, row.position) if row else None
+
     @staticmethod
     def get_latest_record(session: Session, session_uuid: str) -> Optional[HistoryRecordDB]:
         """Get the latest history record of a session"""
@@ -92,8 +255,41 @@ class HistoryDAO:
         return True
 
     @staticmethod
-    def update_record_articles(session: Session, record_id: int, articles: List[str]) -> bool:
-        """Update record article chapters"""
+    def update_record_topic_and_refs(session: Session, record_id: int, topic: str, references: Dict[str, Any]) -> bool:
+        """Update record topic and references data with one UPDATE statement"""
+        updated = session.query(HistoryRecordDB).filter(
+            HistoryRecordDB.id == record_id
+        ).update({
+            "topic": topic,
+            "references_data": references,
+            "updated_at": datetime.utcnow(),
+        }, synchronize_session=False)
+        
+        if not updated:
+            return False
+        
+        logger.info(f"Updated record {record_id} topic and references data")
+        return True
+
+    @staticmethod
+    def update_record_articles(session: Session, record_id: int, articles: List[str], append: bool = False) -> bool:
+        """Update record article chapters
+        
+        With append=True the chapters are appended to the stored list by the
+        database instead of replacing it.
+        """
+        if append:
+            result = session.execute(_APPEND_ARTICLES_SQL, {
+                "record_id": record_id,
+                "chapters": json.dumps(articles),
+                "now": datetime.utcnow(),
+            })
+            if result.rowcount == 0:
+                return False
+            
+            logger.info(f"Appended {len(articles)} chapters to record {record_id}")
+            return True
+        
         record = HistoryDAO.get_history_record(session, record_id)
         if not record:
             return False
@@ -107,16 +303,31 @@ class HistoryDAO:
     @staticmethod
     def update_record_references(session: Session, record_id: int, references: Dict[str, Any]) -> bool:
         """Update record references data"""
-        record = HistoryDAO.get_history_record(session, record_id)
-        if not record:
+        result = session.execute(
+            _UPDATE_REFERENCES_SQL,
+            {"references": references, "now": datetime.utcnow(), "record_id": record_id}
+        )
+        if not result.rowcount:
             return False
         
-        record.references_data = references
-        record.updated_at = datetime.utcnow()
-        
         logger.info(f"Updated record {record_id} references data")
         return True
 
+    @staticmethod
+    def update_record_chapter_references(session: Session, record_id: int, chapter_key: str, chapter_references: Any) -> bool:
+        """Set the references of one chapter without rewriting the whole references data"""
+        result = session.execute(_SET_CHAPTER_REFERENCES_SQL, {
+            "record_id": record_id,
+            "chapter_key": chapter_key,
+            "chapter_references": json.dumps(chapter_references),
+            "now": datetime.utcnow(),
+        })
+        if result.rowcount == 0:
+            return False
+        
+        logger.info(f"Updated record {record_id} references of chapter {chapter_key}")
+        return True
+
     @staticmethod
     def add_message(session: Session, record_id: int, role: str, content: str, message_id: Optional[str] = None) -> Optional[ConversationMessageDB]:
         """Add conversation message (concurrency-safe)"""
@@ -163,6 +374,21 @@ class HistoryDAO:
             ConversationMessageDB.record_id == record_id
         ).order_by(ConversationMessageDB.message_order).all()
 
+    @staticmethod
+    def get_messages_for_records(session: Session, record_ids: List[int]) -> Dict[int, List[ConversationMessageDB]]:
+        """Get messages of several records in one query, grouped by record ID"""
+        grouped: Dict[int, List[ConversationMessageDB]] = {record_id: [] for record_id in record_ids}
+        if not record_ids:
+            return grouped
+        
+        messages = session.query(ConversationMessageDB).filter(
+            ConversationMessageDB.record_id.in_(record_ids)
+        ).order_by(ConversationMessageDB.record_id, ConversationMessageDB.message_order).all()
+        
+        for message in messages:
+            grouped[message.record_id].append(message)
+        return grouped
+
     @staticmethod
     def cleanup_old_records(session: Session, session_uuid: str, max_records: int = 10) -> int:
         """Clean up outdated records of a session
@@ -230,31 +456,36 @@ class HistoryDAO:
         ).order_by(ArticleHistoryDB.timestamp.desc()).first()
 
     @staticmethod
-    def get_records_summary(session: Session, session_uuid: str) -> List[Dict[str, Any]]:
-        """Get summary information of session records"""
-        records = HistoryDAO.get_session_records(session, session_uuid)
+    def get_records_summary(session: Session, session_uuid: str, current_record_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get summary information of session records
+        
+        Rows come back in position order with is_current computed by the query;
+        when current_record_id is None it is resolved from user_sessions. Reads
+        plain rows (no ORM hydration) and only the heads of topic/outline.
+        """
+        rows = session.execute(_RECORDS_SUMMARY_SQL, {
+            "session_uuid": session_uuid,
+            "current_record_id": current_record_id,
+        })
 
         summaries = []
-        for i, record in enumerate(records):
-            outline_preview = record.outline[:100] + "..." if len(record.outline) > 100 else record.outline
-            article_count = len(record.article_chapters) if record.article_chapters else 0
-            topic_preview = record.topic[:50] + "..." if record.topic and len(record.topic) > 50 else (record.topic or "")
-
-            # Fix position numbering: ensure each record has a unique continuous position value
-            # Use loop index i as position, since records are already sorted by creation time
-            position = i
-
-            summaries.append({
-                "id": record.id,
-                "position": position,  # Use continuous index value directly
-                "created_at": record.created_at.isoformat() if record.created_at else None,
-                "updated_at": record.updated_at.isoformat() if record.updated_at else None,
-                "has_outline": bool(record.outline),
-                "has_article": article_count > 0,
-                "has_topic": bool(record.topic),
-                "topic_preview": topic_preview,
-                "article_count": article_count,
-                "outline_preview": outline_preview,
+        for row in rows:
+            summary = dict(row._mapping)
+            outline_head = summary.pop("outline_head")
+            topic_head = summary.pop("topic_head")
+            created_at = summary["created_at"].isoformat() if summary["created_at"] else None
+            updated_at = summary["updated_at"]
+
+            summary.update({
+                "pos": summary["position"],
+                "is_current": bool(summary["is_current"]),
+                "created_at": created_at,
+                "timestamp": created_at or datetime.now().isoformat(),
+                "updated_at": updated_at.isoformat() if updated_at else None,
+                "has_article": summary["article_count"] > 0,
+                "topic_preview": topic_head[:50] + "..." if len(topic_head) > 50 else topic_head,
+                "outline_preview": outline_head[:100] + "..." if len(outline_head) > 100 else outline_head,
             })
+            summaries.append(summary)
 
         return summaries
@@ -2,17 +2,32 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from database.models import UserSessionDB, HistoryRecordDB
+from database.models import UserSessionDB, HistoryRecordDB, ConversationMessageDB
 
 
 logger = logging.getLogger(__name__)
 
+# Point current_record_id at the record found at a position (same ordering as
+# HistoryDAO.get_session_records) without loading the records first
+_UPDATE_CURRENT_RECORD_BY_POS_SQL = text("""
+    UPDATE user_sessions
+    SET current_record_id = target.id, lock_version = lock_version + 1, updated_at = :now
+    FROM (
+        SELECT id FROM history_records
+        WHERE session_uuid = :session_uuid
+        ORDER BY created_at ASC, id ASC
+        OFFSET :pos LIMIT 1
+    ) AS target
+    WHERE user_sessions.uuid = :session_uuid
+    RETURNING user_sessions.current_record_id
+""")
+
 
 class SessionDAO:
     """User session data access object
@@ -98,6 +113,49 @@ class SessionDAO:
             logger.error(f"Failed to update session: {e}")
             return False
 
+    @staticmethod
+    def update_current_record_by_pos(session: Session, session_uuid: str, pos: int) -> Optional[int]:
+        """Set the current record to the one at position pos in a single statement
+        
+        Returns the new current record ID, or None if there is no record at pos.
+        """
+        if pos < 0:
+            return None
+        
+        record_id = session.execute(_UPDATE_CURRENT_RECORD_BY_POS_SQL, {
+            "session_uuid": session_uuid,
+            "pos": pos,
+            "now": datetime.utcnow(),
+        }).scalar()
+        
+        if record_id is not None:
+            logger.info(f"Updated session {session_uuid} current record: {record_id} (pos={pos})")
+        return record_id
+
+    @staticmethod
+    def get_session_version(session: Session, session_uuid: str) -> Optional[Tuple]:
+        """Get a cheap version token of a session and its history records
+        
+        The token changes whenever the session row, any of its records or any
+        of their messages is inserted, updated or deleted, so cached records
+        (and their loaded messages) can be reused while it stays equal.
+        """
+        row = session.query(
+            UserSessionDB.updated_at,
+            func.count(func.distinct(HistoryRecordDB.id)),
+            func.max(HistoryRecordDB.updated_at),
+            func.count(ConversationMessageDB.id),
+            func.max(ConversationMessageDB.id),
+        ).outerjoin(
+            HistoryRecordDB, HistoryRecordDB.session_uuid == UserSessionDB.uuid
+        ).outerjoin(
+            ConversationMessageDB, ConversationMessageDB.record_id == HistoryRecordDB.id
+        ).filter(
+            UserSessionDB.uuid == session_uuid
+        ).group_by(UserSessionDB.updated_at).first()
+        
+        return tuple(row) if row else None
+
     @staticmethod
     def get_session_status(session: Session, session_uuid: str) -> Optional[str]:
         """Get session status"""
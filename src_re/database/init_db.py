@@ -55,6 +55,12 @@ def init_database() -> None:
             END$$;
         """))
 
+        # History migration flag on user_sessions (see migration_add_migration_done.py)
+        conn.execute(text("""
+            ALTER TABLE user_sessions
+            ADD COLUMN IF NOT EXISTS migration_done BOOLEAN DEFAULT FALSE NOT NULL
+        """))
+
         # Session State Index
         conn.execute(text("""
             CREATE INDEX IF NOT EXISTS idx_user_sessions_status 
@@ -67,6 +73,19 @@ def init_database() -> None:
             ON history_records(session_uuid, created_at DESC)
         """))
         
+        # Trigram index so the history migration's LIKE '%email%' lookup avoids a sequential scan
+        # (skipped with a notice when the pg_trgm extension cannot be installed)
+        conn.execute(text("""
+            DO $$
+            BEGIN
+                CREATE EXTENSION IF NOT EXISTS pg_trgm;
+                CREATE INDEX IF NOT EXISTS idx_history_records_session_uuid_trgm
+                ON history_records USING gin (session_uuid gin_trgm_ops);
+            EXCEPTION WHEN OTHERS THEN
+                RAISE NOTICE 'pg_trgm unavailable, skipping idx_history_records_session_uuid_trgm';
+            END$$;
+        """))
+        
         # Message Uniqueness Index
         conn.execute(text("""
             CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_record_order 
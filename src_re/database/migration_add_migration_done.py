@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Database migration script: add the 'migration_done' column to the user_sessions table.
+Sessions with the flag set skip the legacy history migration on load.
+Before running this script, please ensure that the database is backed up.
+"""
+
+import logging
+import sys
+import os
+
+# Add parent directory to path to ensure modules can be imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from tool.config_manager import ConfigManager
+from database.session_manager import DatabaseSessionManager
+
+
+def migrate_add_migration_done_field():
+    """Add the 'migration_done' column to the user_sessions table"""
+    
+    # Read configuration
+    current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config_path = os.path.join(current_dir, "config.yaml")
+    config_manager = ConfigManager(config_file=config_path)
+    config = config_manager.config
+    
+    # Initialize database connection
+    db_manager = DatabaseSessionManager(config.database)
+    
+    try:
+        with db_manager.get_session() as session:
+            # Check whether the 'migration_done' column already exists
+            check_column_query = text("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'user_sessions' 
+                AND column_name = 'migration_done'
+            """)
+            
+            result = session.execute(check_column_query)
+            if result.fetchone():
+                print("✅ migration_done column already exists, no migration needed")
+                return True
+            
+            # Add the 'migration_done' column
+            add_column_query = text("""
+                ALTER TABLE user_sessions 
+                ADD COLUMN migration_done BOOLEAN DEFAULT FALSE NOT NULL
+            """)
+            
+            print("🔄 Adding 'migration_done' column to user_sessions table...")
+            session.execute(add_column_query)
+            session.commit()
+            
+            print("✅ Successfully added 'migration_done' column to user_sessions table")
+            return True
+                
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        logging.error(f"Migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    print("=" * 60)
+    print("🗃️  Database migration: add 'migration_done' column to user_sessions table")
+    print("=" * 60)
+    
+    success = migrate_add_migration_done_field()
+    
+    if success:
+        print("=" * 60)
+        print("🎉 Migration completed!")
+        print("Sessions now skip the history migration once it has run")
+        print("=" * 60)
+        sys.exit(0)
+    else:
+        print("=" * 60)
+        print("💥 Migration failed! Please check error details and retry")
+        print("=" * 60)
+        sys.exit(1)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Database migration script: add a trigram index on history_records.session_uuid.
+The history migration looks up sessions with LIKE '%email%', which cannot use a B-tree index.
+Before running this script, please ensure that the database is backed up.
+"""
+
+import logging
+import sys
+import os
+
+# Add parent directory to path to ensure modules can be imported
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from tool.config_manager import ConfigManager
+from database.session_manager import DatabaseSessionManager
+
+
+INDEX_NAME = "idx_history_records_session_uuid_trgm"
+
+
+def migrate_add_session_uuid_trgm_index():
+    """Create the pg_trgm extension and a GIN trigram index on history_records.session_uuid"""
+    
+    # Read configuration
+    current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config_path = os.path.join(current_dir, "config.yaml")
+    config_manager = ConfigManager(config_file=config_path)
+    config = config_manager.config
+    
+    # Initialize database connection
+    db_manager = DatabaseSessionManager(config.database)
+    
+    try:
+        with db_manager.get_session() as session:
+            # Check whether the index already exists
+            check_index_query = text("""
+                SELECT indexname 
+                FROM pg_indexes 
+                WHERE tablename = 'history_records' 
+                AND indexname = :index_name
+            """)
+            
+            result = session.execute(check_index_query, {"index_name": INDEX_NAME})
+            if result.fetchone():
+                print(f"✅ Index {INDEX_NAME} already exists, no migration needed")
+                return True
+            
+            print("🔄 Enabling pg_trgm extension...")
+            session.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            
+            print(f"🔄 Creating {INDEX_NAME} on history_records(session_uuid)...")
+            session.execute(text(f"""
+                CREATE INDEX IF NOT EXISTS {INDEX_NAME}
+                ON history_records USING gin (session_uuid gin_trgm_ops)
+            """))
+            session.commit()
+            
+            print(f"✅ Successfully created {INDEX_NAME}")
+            return True
+                
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        logging.error(f"Migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
+    print("=" * 60)
+    print("🗃️  Database migration: add trigram index on history_records.session_uuid")
+    print("=" * 60)
+    
+    success = migrate_add_session_uuid_trgm_index()
+    
+    if success:
+        print("=" * 60)
+        print("🎉 Migration completed!")
+        print("History migration email lookups can now use the trigram index")
+        print("=" * 60)
+        sys.exit(0)
+    else:
+        print("=" * 60)
+        print("💥 Migration failed! Please check error details and retry")
+        print("=" * 60)
+        sys.exit(1)
@@ -69,6 +69,7 @@ class UserSessionDB(Base):
     status: Mapped[str] = mapped_column(String(20), default="active", nullable=False)  # active, inactive, archived
     lock_version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # Optimistic lock version
     owner_user_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Owner user ID (users.id)
+    migration_done: Mapped[bool] = mapped_column(Boolean, default=False, server_default="false", nullable=False)  # Legacy history already migrated into this session
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
 
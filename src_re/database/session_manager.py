@@ -38,8 +38,9 @@ class DatabaseSessionManager:
             max_overflow=self.db_config.max_overflow,
             pool_timeout=self.db_config.pool_timeout,
             pool_recycle=self.db_config.pool_recycle,
+            pool_use_lifo=self.db_config.pool_use_lifo,  # Keep a small set of warm connections in use
             echo=self.db_config.echo,
-            pool_pre_ping=True,  # Validate connection liveness
+            pool_pre_ping=self.db_config.pool_pre_ping,  # Validate connection liveness
         )
         
         self._session_factory = sessionmaker(
@@ -15,6 +15,10 @@ import tempfile
 import os
 import logging
 import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 
 # Try to import vector retrieval dependencies with graceful fallback
 try:
@@ -48,6 +52,26 @@ except ImportError:
     print("⚠️ transformers not available either")
     TRANSFORMERS_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# Directory for persistent vectorstores (align with docker volume /app/private_chroma_stores)
+_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../private_chroma_stores'))
+
+# All chunks of a session live in one Chroma collection, persisted in this sub-directory
+# of the session dir and tagged with metadata {"source": file_name}. Older per-file
+# store directories next to it are still loaded for backward compatibility.
+_SESSION_STORE_DIRNAME = "_session_store"
+_SESSION_COLLECTION_NAME = "private"
+
+# Maximum number of query embeddings kept in memory
+_QUERY_EMBEDDING_CACHE_SIZE = 256
+
+# Background pool for I/O-bound work (session preloads, removing Chroma persist dirs), shared by all instances
+_IO_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="private-info-io")
+
+# Serializes the first embedding model load across threads and instances
+_EMBEDDINGS_LOAD_LOCK = threading.Lock()
+
 
 class LocalSentenceTransformerEmbeddings(Embeddings):
     """
@@ -259,6 +283,13 @@ class PrivateInformation:
         # Vector stores for each session (will contain lists of vectorstores)
         self.session_vectorstores = {}
         
+        # Consolidated Chroma collection for each session (also present in session_vectorstores)
+        self.session_stores = {}
+        
+        # LRU cache of query text -> embedding vector, shared by all sessions
+        self._query_embeddings: OrderedDict = OrderedDict()
+        self._query_embedding_lock = threading.Lock()
+        
         # Initialize text splitter but defer embedding model loading
         if VECTOR_SUPPORT:
             self.text_splitter = RecursiveCharacterTextSplitter(
@@ -284,37 +315,76 @@ class PrivateInformation:
             bool: True if embeddings are ready, False otherwise
         """
         if VECTOR_SUPPORT and self.embedding_manager and self.embeddings is None:
-            try:
-                print(f"🚀 Loading embedding model on first use...")
-                self.embeddings = self.embedding_manager.get_embeddings(self.embedding_model_path)
-                return True
-            except Exception as e:
-                print(f"❌ Failed to load embedding model: {e}")
-                self.embeddings = None
-                return False
+            with _EMBEDDINGS_LOAD_LOCK:
+                # Another thread may have finished loading while we waited
+                if self.embeddings is not None:
+                    return True
+                try:
+                    print(f"🚀 Loading embedding model on first use...")
+                    self.embeddings = self.embedding_manager.get_embeddings(self.embedding_model_path)
+                    return True
+                except Exception as e:
+                    print(f"❌ Failed to load embedding model: {e}")
+                    self.embeddings = None
+                    return False
         return self.embeddings is not None
     
+    def _get_session_store(self, session_id: str, create: bool = False) -> Optional[Any]:
+        """
+        Get the consolidated Chroma collection of a session.
+        
+        The store is opened once and cached. Without ``create`` it is only
+        opened if it already exists on disk.
+        
+        Args:
+            session_id: Session identifier
+            create: Create the persist directory if it does not exist yet
+            
+        Returns:
+            Chroma vectorstore instance or None if unavailable
+        """
+        store = self.session_stores.get(session_id)
+        if store is not None:
+            return store
+        
+        store_dir = os.path.join(_BASE_DIR, session_id, _SESSION_STORE_DIRNAME)
+        if not create and not os.path.isdir(store_dir):
+            return None
+        if not self._ensure_embeddings_loaded():
+            return None
+        
+        os.makedirs(store_dir, exist_ok=True)
+        store = Chroma(
+            collection_name=_SESSION_COLLECTION_NAME,
+            persist_directory=store_dir,
+            embedding_function=self.embeddings
+        )
+        return self.session_stores.setdefault(session_id, store)
+    
     def _load_all_vectorstores_for_session(self, session_id: str, session_dir: str):
         """
         Load all persistent vectorstores for a session from disk.
         
-        This method scans the session directory and loads existing vectorstores
-        into memory, allowing the system to resume operations after restart.
+        This method loads the session's consolidated collection plus any
+        legacy per-file vectorstores into memory, allowing the system to
+        resume operations after restart.
         
         Args:
             session_id: Session identifier
             session_dir: Directory path for the session
         """
-        import os
-        from langchain_community.vectorstores import Chroma
         if not os.path.isdir(session_dir):
             return
-        if session_id not in self.session_vectorstores:
-            self.session_vectorstores[session_id] = []
         self.session_vectorstores[session_id] = []
+        try:
+            session_store = self._get_session_store(session_id)
+            if session_store is not None:
+                self.session_vectorstores[session_id].append(session_store)
+        except Exception as e:
+            logger.warning("Failed to load session store for %s: %s", session_id, e)
         for file_dir in os.listdir(session_dir):
             file_store_dir = os.path.join(session_dir, file_dir)
-            if os.path.isdir(file_store_dir):
+            if file_dir != _SESSION_STORE_DIRNAME and os.path.isdir(file_store_dir):
                 try:
                     vectorstore = Chroma(
                         persist_directory=file_store_dir,
@@ -322,7 +392,33 @@ class PrivateInformation:
                     )
                     self.session_vectorstores[session_id].append(vectorstore)
                 except Exception as e:
-                    print(f"Failed to load vectorstore for {file_dir}: {e}")
+                    logger.warning("Failed to load vectorstore for %s: %s", file_dir, e)
+    
+    def _embed_query(self, query: str) -> List[float]:
+        """
+        Embed a search query, reusing the vector of a recently seen identical query.
+        
+        Query embeddings depend only on the text and the model, so they stay
+        valid when files are uploaded or deleted.
+        
+        Args:
+            query: Search query string
+            
+        Returns:
+            Embedding vector of the query
+        """
+        with self._query_embedding_lock:
+            embedding = self._query_embeddings.get(query)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(query)
+                return embedding
+        
+        embedding = self.embeddings.embed_query(query)
+        with self._query_embedding_lock:
+            self._query_embeddings[query] = embedding
+            if len(self._query_embeddings) > _QUERY_EMBEDDING_CACHE_SIZE:
+                self._query_embeddings.popitem(last=False)
+        return embedding
     
     def generate_session_id(self) -> str:
         """
@@ -335,15 +431,16 @@ class PrivateInformation:
     
     def _create_vectorstore_for_session(self, session_id: str, documents: List[Document], file_identifier: str = None) -> Optional[Any]:
         """
-        Create persistent vector store for a specific session and file.
+        Add document chunks to the persistent vector store of a session.
         
-        This method creates a Chroma vectorstore with persistent storage,
-        allowing the embeddings to survive application restarts.
+        Chunks are written into the session's single Chroma collection; each
+        chunk keeps its ``source`` metadata so files can be filtered and
+        deleted individually.
         
         Args:
             session_id: Session identifier
             documents: List of document chunks to vectorize
-            file_identifier: Optional file name for directory organization
+            file_identifier: Optional file name, used for logging
             
         Returns:
             Chroma vectorstore instance or None if creation fails
@@ -352,31 +449,16 @@ class PrivateInformation:
             return None
         
         try:
-            # Create persistent directory for this session's vector store
-            base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../private_chroma_stores'))
-            session_dir = os.path.join(base_dir, session_id)
-            print(f"📂 Private KB base_dir: {base_dir}")
-            print(f"📂 Private KB session_dir: {session_dir}")
-            os.makedirs(session_dir, exist_ok=True)
-            
-            if file_identifier:
-                # Sanitize file identifier for directory name to avoid path issues
-                safe_identifier = file_identifier.replace('/', '_').replace('\\', '_')
-                persist_dir = os.path.join(session_dir, safe_identifier)
-            else:
-                persist_dir = os.path.join(session_dir, 'default')
-            
-            os.makedirs(persist_dir, exist_ok=True)
-            
-            from langchain_community.vectorstores import Chroma
-            vectorstore = Chroma.from_documents(
-                documents=documents,
-                embedding=self.embeddings,
-                persist_directory=persist_dir
-            )
+            print(f"📂 Private KB base_dir: {_BASE_DIR}")
+            vectorstore = self._get_session_store(session_id, create=True)
+            if vectorstore is None:
+                return None
+            for doc in documents:
+                doc.metadata['session_id'] = session_id
+            vectorstore.add_documents(documents)
             vectorstore.persist()
             identifier_info = f" for file '{file_identifier}'" if file_identifier else ""
-            print(f"🔍 Created persistent vector store for session {session_id}{identifier_info} with {len(documents)} chunks")
+            print(f"🔍 Added {len(documents)} chunks{identifier_info} to vector store of session {session_id}")
             return vectorstore
         except Exception as e:
             print(f"❌ Failed to create vector store for session {session_id}: {e}")
@@ -423,6 +505,9 @@ class PrivateInformation:
                 
                 # Split document into chunks for optimal vectorization
                 chunks = self.text_splitter.split_documents([doc])
+                # chunk_index 0 marks the one row per file that file listings read
+                for chunk_index, chunk in enumerate(chunks):
+                    chunk.metadata['chunk_index'] = chunk_index
                 documents.extend(chunks)
                 print(f"📄 Split file '{file_name}' into {len(chunks)} chunks")
         
@@ -480,9 +565,7 @@ class PrivateInformation:
         if VECTOR_SUPPORT and self._ensure_embeddings_loaded():
             print("✅ Vector support and embeddings ready, processing content...")
             
-            # Directory for persistent vectorstores (align with docker volume /app/private_chroma_stores)
-            base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../private_chroma_stores'))
-            session_dir = os.path.join(base_dir, session_id)
+            session_dir = os.path.join(_BASE_DIR, session_id)
             
             # Load all existing vectorstores for this session
             self._load_all_vectorstores_for_session(session_id, session_dir)
@@ -503,10 +586,10 @@ class PrivateInformation:
                     # Create vectorstore using existing helper function
                     vectorstore = self._create_vectorstore_for_session(session_id, documents, file_name)
                     if vectorstore:
-                        # Add new vectorstore to the list
-                        if session_id not in self.session_vectorstores:
-                            self.session_vectorstores[session_id] = []
-                        self.session_vectorstores[session_id].append(vectorstore)
+                        # Register the session store once in the search list
+                        session_stores = self.session_vectorstores.setdefault(session_id, [])
+                        if not any(vs is vectorstore for vs in session_stores):
+                            session_stores.append(vectorstore)
                         print(f"✅ Created vectorstore for file '{file_name}' in session {session_id}")
 
         print(f"📁 Saved {len(new_file_infos)} new private files for session {session_id}")
@@ -543,13 +626,20 @@ class PrivateInformation:
             return None
         
         try:
+            # Embed the query once for all vectorstores; repeated queries reuse the cached vector
+            if not self._ensure_embeddings_loaded():
+                return None
+            query_embedding = self._embed_query(query)
+            
             # Collect results from all vectorstores with their similarity scores
             all_results_with_similarities = []
             all_candidates_debug = []  # keep all candidates for debug even if filtered out
             for i, vectorstore in enumerate(vectorstores):
                 try:
-                    # Use similarity_search_with_score to get similarity scores
-                    store_results_with_scores = vectorstore.similarity_search_with_score(query, k=top_k)
+                    # Same (doc, distance) pairs as similarity_search_with_score, without re-embedding
+                    store_results_with_scores = vectorstore.similarity_search_by_vector_with_relevance_scores(
+                        query_embedding, k=top_k
+                    )
                     # Set similarity threshold for quality filtering
                     similarity_threshold = 0.17                  
                     # Filter out results with similarity below threshold
@@ -621,6 +711,7 @@ class PrivateInformation:
                 print(f"  {i+1}. Similarity: {item['similarity']:.4f}, Source: {item['source']}")
                 preview = item['content'][:100].replace('\n', ' ')
                 print(f"     '{preview}...'")               
+            
             return relevant_content
             
         except Exception as e:
@@ -660,7 +751,7 @@ class PrivateInformation:
             }
             chunks.append(chunk)
         
-        return chunks if chunks else None
+        return chunks
     
     def preload_session_data(self, session_id: str) -> bool:
         """
@@ -677,57 +768,55 @@ class PrivateInformation:
             bool: Whether data was successfully preloaded
         """
         try:
-            print(f"🔄 Starting to preload data for session {session_id}...")
+            logger.info("🔄 Starting to preload data for session %s...", session_id)
             start_time = time.time()
             
             # Quick check if data is already loaded to avoid redundant work
             if (session_id in self.private_files and 
                 session_id in self.session_vectorstores and 
                 len(self.session_vectorstores[session_id]) > 0):
-                print(f"⚡ Session {session_id} data already loaded, skipping preload")
+                logger.info("⚡ Session %s data already loaded, skipping preload", session_id)
                 return True
             
             # Try to load embeddings, but don't block file listing if it fails
             embeddings_ready = self._ensure_embeddings_loaded()
             if not embeddings_ready:
-                print(f"⚠️ Embedding model not loaded, will only scan files without loading vectorstores")
+                logger.warning("⚠️ Embedding model not loaded, will only scan files without loading vectorstores")
             
-            import os
-            base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../private_chroma_stores'))
-            session_dir = os.path.join(base_dir, session_id)
+            session_dir = os.path.join(_BASE_DIR, session_id)
             
             # Check if session directory exists
             if not os.path.isdir(session_dir):
-                print(f"📁 Session {session_id} has no private file storage directory yet")
+                logger.info("📁 Session %s has no private file storage directory yet", session_id)
                 # Initialize empty data structures
-                self.private_files[session_id] = {
+                self.private_files.setdefault(session_id, {
                     'files': [],
                     'timestamp': time.time(),
                     'uuid': session_id
-                }
-                self.session_vectorstores[session_id] = []
+                })
+                self.session_vectorstores.setdefault(session_id, [])
                 return True
             
-            # 1. Preload private_files by scanning disk (always possible)
-            files_info = []
+            # 1. Preload private_files by scanning disk (always possible);
+            # keyed by file id (the source file name) so a file is listed once
+            files_by_id: Dict[str, Dict[str, Any]] = {}
             vectorstores_loaded = []
             
             for file_dir in os.listdir(session_dir):
                 file_store_dir = os.path.join(session_dir, file_dir)
-                if os.path.isdir(file_store_dir):
+                if file_dir != _SESSION_STORE_DIRNAME and os.path.isdir(file_store_dir):
                     # Always add file info based on folder name (fallback)
-                    files_info.append({
+                    file_info = {
                         'name': file_dir,
                         'type': 'unknown',
                         'size': 0,
                         'upload_time': time.time(),
                         'status': 'processed'
-                    })
+                    }
                     
                     # Only try to load vectorstore if embeddings are ready
                     if embeddings_ready:
                         try:
-                            from langchain_community.vectorstores import Chroma
                             vectorstore = Chroma(
                                 persist_directory=file_store_dir,
                                 embedding_function=self.embeddings
@@ -736,24 +825,51 @@ class PrivateInformation:
                             
                             # Try to get metadata from vectorstore for better file info
                             try:
-                                docs = vectorstore.get(include=['metadatas'])
+                                docs = vectorstore.get(include=['metadatas'], limit=1)
                                 if docs and 'metadatas' in docs and docs['metadatas']:
                                     meta = docs['metadatas'][0]
                                     # Update the file info with metadata
-                                    for fi in files_info:
-                                        if fi['name'] == file_dir:
-                                            fi.update({
-                                                'name': meta.get('source', file_dir),
-                                                'type': meta.get('file_type', 'unknown'),
-                                                'size': meta.get('file_size', 0),
-                                                'upload_time': meta.get('upload_time', time.time())
-                                            })
-                                            break
+                                    file_info.update({
+                                        'name': meta.get('source', file_dir),
+                                        'type': meta.get('file_type', 'unknown'),
+                                        'size': meta.get('file_size', 0),
+                                        'upload_time': meta.get('upload_time', time.time())
+                                    })
                             except Exception as meta_e:
-                                print(f"⚠️ Failed to read metadata from {file_dir}: {meta_e}")
+                                logger.warning("⚠️ Failed to read metadata from %s: %s", file_dir, meta_e)
                         except Exception as e:
-                            print(f"⚠️ Failed to load vectorstore {file_dir}: {e}")
-                            # File info already added above, so continue
+                            logger.warning("⚠️ Failed to load vectorstore %s: %s", file_dir, e)
+                            # Keep the folder-based file info
+                    files_by_id.setdefault(file_info['name'], file_info)
+            
+            # Files stored in the consolidated session collection; only the first chunk
+            # of each file is read instead of every chunk's metadata
+            if embeddings_ready:
+                try:
+                    session_store = self._get_session_store(session_id)
+                    if session_store is not None:
+                        vectorstores_loaded.insert(0, session_store)
+                        docs = session_store.get(
+                            where={'$and': [{'session_id': session_id}, {'chunk_index': 0}]},
+                            include=['metadatas']
+                        )
+                        metadatas = (docs or {}).get('metadatas') or []
+                        if not metadatas and session_store._collection.count():
+                            # Chunks added before session_id/chunk_index were recorded
+                            metadatas = (session_store.get(include=['metadatas']) or {}).get('metadatas') or []
+                        for meta in metadatas:
+                            source = meta.get('source', 'unknown')
+                            files_by_id.setdefault(source, {
+                                'name': source,
+                                'type': meta.get('file_type', 'unknown'),
+                                'size': meta.get('file_size', 0),
+                                'upload_time': meta.get('upload_time', time.time()),
+                                'status': 'processed'
+                            })
+                except Exception as e:
+                    logger.warning("⚠️ Failed to load session store for %s: %s", session_id, e)
+            
+            files_info = list(files_by_id.values())
             
             # 2. Update in-memory data structures
             self.private_files[session_id] = {
@@ -763,34 +879,32 @@ class PrivateInformation:
             }
             
             # Initialize or clear existing vectorstores list
-            if session_id not in self.session_vectorstores:
-                self.session_vectorstores[session_id] = []
-            else:
-                self.session_vectorstores[session_id].clear()
+            session_stores = self.session_vectorstores.setdefault(session_id, [])
+            session_stores.clear()
             
             # Add successfully loaded vectorstores (only if any)
             if vectorstores_loaded:
-                self.session_vectorstores[session_id].extend(vectorstores_loaded)
+                session_stores.extend(vectorstores_loaded)
             
             # 3. Output preload results
             files_count = len(files_info)
             vectorstores_count = len(vectorstores_loaded)
             duration = time.time() - start_time
             
-            print(f"✅ Session {session_id} data preload completed in {duration:.2f}s:")
-            print(f"   📄 Private files: {files_count}")
-            print(f"   🧠 Vector stores: {vectorstores_count}")
+            logger.info("✅ Session %s data preload completed in %.2fs:", session_id, duration)
+            logger.info("   📄 Private files: %d", files_count)
+            logger.info("   🧠 Vector stores: %d", vectorstores_count)
             if not embeddings_ready:
-                print(f"   ⚠️ Note: Embedding model not loaded, vectorstores will be loaded when needed")
+                logger.info("   ⚠️ Note: Embedding model not loaded, vectorstores will be loaded when needed")
             
-            if files_count > 0:
-                print(f"   📋 File list: {[f['name'] for f in files_info]}")
+            if files_count > 0 and logger.isEnabledFor(logging.INFO):
+                logger.info("   📋 File list: %s", [f['name'] for f in files_info])
             
             return True
             
         except Exception as e:
             duration = time.time() - start_time if 'start_time' in locals() else 0
-            print(f"❌ Error occurred while preloading session {session_id} data after {duration:.2f}s: {e}")
+            logger.error("❌ Error occurred while preloading session %s data after %.2fs: %s", session_id, duration, e)
             self.private_files[session_id] = {
                 'files': [],
                 'timestamp': time.time(),
@@ -800,6 +914,30 @@ class PrivateInformation:
             # Even if embeddings failed, we still have file list, so return True
             return True
     
+    def preload_sessions(self, session_ids: List[str]) -> Dict[str, bool]:
+        """
+        Preload several sessions concurrently (e.g. from a warm-up script).
+        
+        Each session is preloaded with preload_session_data on the shared I/O
+        pool; the call returns once all of them have finished.
+        
+        Args:
+            session_ids: Session identifiers to preload
+            
+        Returns:
+            Dictionary mapping each session ID to its preload result
+        """
+        futures = {sid: _IO_POOL.submit(self.preload_session_data, sid) for sid in session_ids}
+        wait(futures.values())
+        results = {}
+        for sid, future in futures.items():
+            try:
+                results[sid] = future.result()
+            except Exception as e:
+                logger.error("❌ Preload failed for session %s: %s", sid, e)
+                results[sid] = False
+        return results
+    
     def has_vector_capability(self, session_id: str) -> bool:
         """
         Check if vector retrieval is available for the session.
@@ -828,20 +966,19 @@ class PrivateInformation:
         Returns:
             Dictionary with file information or empty structure if not initialized
         """
-        if session_id not in self.private_files:
-            self.private_files[session_id] = {
-                'files': [],
-                'timestamp': time.time(),
-                'uuid': session_id
-            }
-        return self.private_files.get(session_id)
+        return self.private_files.setdefault(session_id, {
+            'files': [],
+            'timestamp': time.time(),
+            'uuid': session_id
+        })
     
     def delete_private_file(self, file_name: str, session_id: str) -> bool:
         """
         Delete specific private file from specified session and remove persistent vectorstore.
         
-        This method removes the file from memory, deletes the persistent
-        vectorstore directory, and updates the session's vectorstore list.
+        This method removes the file from memory, deletes its chunks from the
+        session collection (or its legacy per-file vectorstore directory), and
+        updates the session's vectorstore list.
         
         Args:
             file_name: Name of file to delete
@@ -859,26 +996,27 @@ class PrivateInformation:
             if len(updated_files) != len(files_data):
                 self.private_files[session_id]['files'] = updated_files
                 changed = True
-        # Remove persistent vectorstore dir
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../private_chroma_stores'))
-        session_dir = os.path.join(base_dir, session_id)
-        safe_identifier = file_name.replace('/', '_').replace('\\', '_')
-        file_store_dir = os.path.join(session_dir, safe_identifier)
-        if os.path.isdir(file_store_dir):
-            import shutil
-            try:
-                shutil.rmtree(file_store_dir)
-                changed = True
-            except Exception as e:
-                print(f"Failed to delete vectorstore dir {file_store_dir}: {e}")
-        # Also update self.session_vectorstores
+        # Remove the file's chunks from the consolidated session collection
+        try:
+            session_store = self._get_session_store(session_id)
+            if session_store is not None:
+                where = {"source": file_name}
+                if session_store.get(where=where, limit=1).get('ids'):
+                    session_store._collection.delete(where=where)
+                    changed = True
+        except Exception as e:
+            logger.warning("Failed to delete chunks of %s from session store: %s", file_name, e)
+        # Also update self.session_vectorstores (legacy per-file stores)
         if session_id in self.session_vectorstores:
             # Remove vectorstores for this file
             new_list = []
             for vs in self.session_vectorstores[session_id]:
+                if vs is self.session_stores.get(session_id):
+                    new_list.append(vs)
+                    continue
                 try:
                     # Try to check if this vectorstore is for the file
-                    docs = vs.get(include=['metadatas'])
+                    docs = vs.get(include=['metadatas'], limit=1)
                     if docs and 'metadatas' in docs and docs['metadatas']:
                         meta = docs['metadatas'][0]
                         if meta.get('source') != file_name:
@@ -888,6 +1026,16 @@ class PrivateInformation:
                 except Exception:
                     new_list.append(vs)
             self.session_vectorstores[session_id] = new_list
+        # Remove persistent vectorstore dir in the background once memory state is updated
+        session_dir = os.path.join(_BASE_DIR, session_id)
+        safe_identifier = file_name.replace('/', '_').replace('\\', '_')
+        file_store_dir = os.path.join(session_dir, safe_identifier)
+        if os.path.isdir(file_store_dir):
+            try:
+                _IO_POOL.submit(shutil.rmtree, file_store_dir, True)
+                changed = True
+            except Exception as e:
+                logger.warning("Failed to schedule deletion of vectorstore dir %s: %s", file_store_dir, e)
         return changed
        
     
@@ -901,26 +1049,26 @@ class PrivateInformation:
         Args:
             session_ids_to_keep: List of session IDs to preserve
         """
-        sessions_to_delete = []
-        for session_id in self.private_files.keys():
-            if session_id not in session_ids_to_keep:
-                sessions_to_delete.append(session_id)
+        sessions_to_delete = self.private_files.keys() - set(session_ids_to_keep)
         
         for session_id in sessions_to_delete:
-            del self.private_files[session_id]
-            
-            # Clean up vector stores
-            if session_id in self.session_vectorstores:
-                self.session_vectorstores[session_id] = []
+            self.private_files.pop(session_id, None)
+            # Drop vector stores entirely so they can be freed
+            self.session_vectorstores.pop(session_id, None)
+            self.session_stores.pop(session_id, None)
         
         print(f"🧹 Cleaned up {len(sessions_to_delete)} old sessions")
     
-    def get_session_files_info(self, session_id: str) -> Optional[List[Dict[str, Any]]]:
+    def get_session_files_info(self, session_id: str, copy: bool = False) -> Optional[List[Dict[str, Any]]]:
         """
         Get basic file information without content for specified session.
         
+        The stored file entries already carry only name, type, size,
+        upload_time and status, so the underlying list is returned directly.
+        
         Args:
             session_id: Session identifier
+            copy: Return a shallow copy for callers that mutate the result
             
         Returns:
             List of file information dictionaries or None if no files
@@ -930,17 +1078,8 @@ class PrivateInformation:
         if not private_files_data or not private_files_data.get('files'):
             return None
         
-        files_info = []
-        for file_data in private_files_data['files']:
-            files_info.append({
-                'name': file_data.get('name'),
-                'type': file_data.get('type'),
-                'size': file_data.get('size'),
-                'upload_time': file_data.get('upload_time'),
-                'status': file_data.get('status')
-            })
-        
-        return files_info
+        files_info = private_files_data['files']
+        return [dict(file_data) for file_data in files_info] if copy else files_info
     
     def process_uploaded_files(self, files: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -955,23 +1094,23 @@ class PrivateInformation:
         Returns:
             List of processed file data dictionaries
         """
-        processed_files = []
-        
-        for file_data in files:
-            file_name = file_data.get('name', 'unknown')
-            file_content = file_data.get('content', '')
-            file_type = file_data.get('type', 'unknown')
-            file_size = file_data.get('size', 0)
-            
-            print(f"Processing file: {file_name} ({file_type}, {file_size} bytes)")
-            
-            processed_files.append({
-                'name': file_name,
-                'content': file_content,
-                'type': file_type,
-                'size': file_size,
-                'upload_time': time.time(),
+        # A single timestamp is shared by every file in the batch
+        upload_time = time.time()
+        processed_files = [
+            {
+                'name': file_data.get('name', 'unknown'),
+                'content': file_data.get('content', ''),
+                'type': file_data.get('type', 'unknown'),
+                'size': file_data.get('size', 0),
+                'upload_time': upload_time,
                 'status': 'processed'
-            })
+            }
+            for file_data in files
+        ]
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            for file_data in processed_files:
+                logger.debug("Processing file: %s (%s, %s bytes)",
+                             file_data['name'], file_data['type'], file_data['size'])
         
         return processed_files
@@ -8,8 +8,10 @@ class OutlineModify():
 
     def modify_outline(self):
         # You need to make sure that the last element of messages is the user's outline
-        # Check if messages list is not empty before popping
+        # Replace it in place when present, otherwise append
+        message = {"role": "user", "content": self.current_outline}
         if self.messages:
-            self.messages.pop(-1)
-        self.messages.append({"role": "user", "content": self.current_outline})
+            self.messages[-1] = message
+        else:
+            self.messages.append(message)
         return self.messages
\ No newline at end of file
@@ -1,6 +1,6 @@
-from utils.ArticleTextProcessing import ArticleTextProcessing
 from tool.lm import LLMModel
 import logging
+import string
 OUTLINE_POLISH_PROMPT = \
     """
     You are an experienced outline polishing assistant. Please refine the provided outline by improving language expression, optimizing logical structure, and enhancing presentation effectiveness to make the outline clearer, more concise, and easier to understand.
@@ -28,7 +28,15 @@ OUTLINE_POLISH_PROMPT = \
 
     Based on the above information and rules, please polish the outline and return the refined version.
     """
-    
+
+# Split the prompt into (literal, field) segments once so rendering is a plain join
+_POLISH_PARTS = tuple((literal, field) for literal, field, _, _ in string.Formatter().parse(OUTLINE_POLISH_PROMPT))
+
+
+def _render_polish_prompt(outline, polish_requirements, reference) -> str:
+    values = {"outline": outline, "polish_requirements": polish_requirements, "reference": reference}
+    return "".join([literal if field is None else literal + str(values[field]) for literal, field in _POLISH_PARTS])
+
 class OutlinePolish():
 
     def __init__(self, lm: LLMModel, messages: list, current_outline: str, feedback: str, reference: str = "None"):
@@ -40,16 +48,17 @@ class OutlinePolish():
 
     def polish_outline(self):
         # You need to make sure that the last element of messages is the user's outline
-        # Check if messages list is not empty before popping
+        # Replace it in place when present, otherwise append
+        message = {"role": "user",
+                   "content": _render_polish_prompt(self.current_outline,
+                                                    self.feedback,
+                                                    self.reference)}
         if self.messages:
-            self.messages.pop(-1)
-        
-        self.messages.append({"role": "user", 
-                              "content": OUTLINE_POLISH_PROMPT.format(outline=self.current_outline, 
-                                                                      polish_requirements=self.feedback, 
-                                                                      reference=self.reference)})
+            self.messages[-1] = message
+        else:
+            self.messages.append(message)
+        # Cleanup happens once at the router boundary
         polished_outline = self.lm.call(self.messages)
-        polished_outline = ArticleTextProcessing.clean_up_outline(polished_outline)
         logging.info(f"Raw outline: {self.current_outline}")
         logging.info(f"Polished outline: {polished_outline}")
         return polished_outline
@@ -7,13 +7,99 @@ Flask-Login integration, secure password hashing, and session state
 management with proper data structures for conversation history.
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Deque, Iterator
+from collections import OrderedDict, deque
+from collections.abc import Sequence
+from contextlib import contextmanager
+from operator import attrgetter, itemgetter
+import heapq
 from datetime import datetime
 import uuid as uuid_lib
 from flask import session
 from flask_login import UserMixin
+from werkzeug.security import generate_password_hash, check_password_hash
 import logging
-import hashlib
+import time
+
+logger = logging.getLogger(__name__)
+
+# Cached (second, ISO timestamp) pair, refreshed at most once per wall-clock second (see _now_iso)
+_last_ts: Tuple[int, str] = (0, "")
+
+
+def _now_iso() -> str:
+    """Return the current time in ISO format, reusing the string within the same second."""
+    global _last_ts
+    now_sec = int(time.time())
+    cached = _last_ts
+    if cached[0] == now_sec:
+        return cached[1]
+    # Second and string are published together in one assignment, so readers never mix them
+    now_str = datetime.now().isoformat()
+    _last_ts = (now_sec, now_str)
+    return now_str
+
+
+class _ReadOnlyList(Sequence):
+    """Zero-copy read-only view over a list or deque owned by a session."""
+    
+    __slots__ = ('_items',)
+    
+    def __init__(self, items):
+        self._items = items
+    
+    def __getitem__(self, index):
+        return self._items[index]
+    
+    def __len__(self):
+        return len(self._items)
+    
+    def __iter__(self):
+        return iter(self._items)
+    
+    def __repr__(self):
+        return f'{type(self).__name__}({list(self._items)!r})'
+
+# C-level sort keys, built once: session recency and record summary age
+_SESSION_AGE_KEY = attrgetter('updated_at')
+_RECORD_AGE_KEY = itemgetter('ts_ns')
+
+# Reference payload formats callers may pass as format_hint to skip detection
+REFS_CHAPTER_INDEXED = "chapter_indexed"  # {chapter_index: {id: {content, title, url}}}
+REFS_FLAT_WITH_INDEX = "flat_with_index"  # {id: {content, title, url, index}}
+REFS_RAW = "raw"                          # Saved as-is
+
+
+def _chapter_key(key):
+    """Convert a chapter index key to int where possible, without raising."""
+    if isinstance(key, int):
+        return key
+    if isinstance(key, str):
+        digits = key[1:] if key.startswith('-') else key
+        if digits.isdecimal():
+            return int(key)
+    return key
+
+
+def _normalize_chapter_references(references: Dict, validate: bool = True) -> Optional[Dict]:
+    """Validate and normalize chapter-indexed references in a single pass.
+
+    Returns {chapter_index: {id: ref}} with chapter keys converted to int where
+    possible, or None if references are empty or not in chapter-indexed format.
+    validate=False skips the type checks when the caller already knows the format.
+    """
+    if not references:
+        return None
+    if not validate:
+        return {_chapter_key(k): v for k, v in references.items()}
+    normalized = {}
+    for chapter_idx, chapter_refs in references.items():
+        if not isinstance(chapter_refs, dict) or not all(
+            isinstance(ref_data, dict) for ref_data in chapter_refs.values()
+        ):
+            return None
+        normalized[_chapter_key(chapter_idx)] = chapter_refs
+    return normalized
 
 class User(UserMixin):
     """
@@ -36,6 +122,8 @@ class User(UserMixin):
         self.email = email
         self.password_hash = self._hash_password(password) if password else None
         self._is_authenticated = False  # Use private attribute for security
+        # Linked on first check_uuid so authenticated lookups skip the uuid index
+        self.session: Optional['UserSession'] = None
         self.created_at = datetime.now().isoformat()
         self.last_login = None
     
@@ -61,19 +149,19 @@ class User(UserMixin):
         
     def _hash_password(self, password: str) -> str:
         """
-        Hash password using SHA256 for secure storage.
+        Hash password with a salted, cost-tunable hash for secure storage.
         
-        This method implements secure password hashing to prevent
-        plaintext password storage in the system.
+        This method uses werkzeug's password hashing (same as UserDAO) to
+        prevent plaintext or unsalted password storage in the system.
         
         Args:
             password: Plaintext password to hash
             
         Returns:
-            str: SHA256 hash of the password
+            str: Salted password hash
         """
         if password:
-            return hashlib.sha256(password.encode('utf-8')).hexdigest()
+            return generate_password_hash(password)
         return None
     
     def check_password(self, password: str) -> bool:
@@ -88,7 +176,8 @@ class User(UserMixin):
         """
         if not password or not self.password_hash:
             return False
-        return self.password_hash == self._hash_password(password)
+        
+        return check_password_hash(self.password_hash, password)
     
     def set_password(self, password: str):
         """
@@ -108,7 +197,7 @@ class User(UserMixin):
         """
         self.is_authenticated = True
         self.last_login = datetime.now().isoformat()
-        logging.info(f"User {self.email} logged in at {self.last_login}")
+        logger.info("User %s logged in at %s", self.email, self.last_login)
     
     def logout(self):
         """
@@ -118,7 +207,7 @@ class User(UserMixin):
         the logout event for audit purposes.
         """
         self.is_authenticated = False
-        logging.info(f"User {self.email} logged out")
+        logger.info("User %s logged out", self.email)
     
     def get_id(self):
         """
@@ -141,15 +230,39 @@ class HistoryRecord:
     reference materials for each chapter.
     """
     
+    __slots__ = ('_messages', 'topic', 'outline', 'article', '_article_text', 'references',
+                 'timestamp', 'ts_ns')
+    
     def __init__(self):
         """Initialize empty history record with default values."""
-        self.messages = []
+        self._messages: Optional[List] = None  # Created on first access
         self.topic: str = ""         
         self.outline: str = ""
-        self.article: List[str] = []  
+        self.article: Tuple[str, ...] = ()  # Immutable; replaced as a whole on every write
+        self._article_text: Optional[str] = None  # Joined article, reset on every article write
         # Store reference data with chapter indexing for organized access
-        self.references: Dict = {}    # Format: {chapter_index: {id: {content, title, url}}} 
-        self.timestamp = datetime.now().isoformat()
+        # Format: {chapter_index: {id: {content, title, url}}}, None until first write
+        self.references: Optional[Dict] = None
+        self.timestamp = datetime.now().isoformat()  # For display
+        self.ts_ns = time.time_ns()                   # Integer sort key
+    
+    @property
+    def messages(self) -> List:
+        if self._messages is None:
+            self._messages = []
+        return self._messages
+    
+    @messages.setter
+    def messages(self, value: List):
+        self._messages = value
+    
+    def article_text(self) -> str:
+        """Return all articles joined by blank lines, cached until the article changes"""
+        if self._article_text is None:
+            article = self.article
+            # A single chapter is its own text; skip the join's copy
+            self._article_text = article[0] if len(article) == 1 else '\n\n'.join(article)
+        return self._article_text
 
 class UserSession:
     """
@@ -160,6 +273,9 @@ class UserSession:
     methods for creating, accessing, and managing history records.
     """
     
+    __slots__ = ('uuid', 'max_history', 'history_records', 'current_pos', '_current_record',
+                 '_last_pos', '_last_record', 'created_at', 'updated_at')
+    
     def __init__(self, uuid: str):
         """
         Initialize user session with unique identifier.
@@ -169,10 +285,23 @@ class UserSession:
         """
         self.uuid = uuid
         self.max_history = 30  # Maximum number of history records to maintain
-        self.history_records: List[HistoryRecord] = []
+        # Bounded deque: appending beyond max_history evicts the oldest record in O(1)
+        self.history_records: Deque[HistoryRecord] = deque(maxlen=self.max_history)
+        # Invariant: current_pos is -1 with no records, otherwise a valid index, and
+        # _current_record is the record at that index; only create_record and
+        # set_current_pos change them
         self.current_pos: int = -1  # Current active record position
-        self.created_at = datetime.now().isoformat()
-        self.updated_at = datetime.now().isoformat()
+        self._current_record: Optional[HistoryRecord] = None
+        # Single-entry memo of the last get_record lookup; positions shift on append
+        self._last_pos: Optional[int] = None
+        self._last_record: Optional[HistoryRecord] = None
+        self.created_at = _now_iso()
+        self.updated_at = _now_iso()
+    
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group several record writes; in memory they already apply immediately"""
+        yield
     
     def create_record(self):
         """
@@ -185,16 +314,15 @@ class UserSession:
             HistoryRecord: Newly created history record
         """
         record = HistoryRecord()
+        # The bounded deque drops the oldest record once max_history is exceeded
         self.history_records.append(record)
-        
-        # Maintain history size limit by removing oldest records
-        if len(self.history_records) > self.max_history:
-            self.history_records.pop(0)
+        self._last_pos = self._last_record = None
         
         # Update current position to newest record
         self.current_pos = len(self.history_records) - 1
-        self.updated_at = datetime.now().isoformat()
-        logging.info(f"Created new record at pos {self.current_pos} for session {self.uuid}")
+        self._current_record = record
+        self.updated_at = _now_iso()
+        logger.info("Created new record at pos %s for session %s", self.current_pos, self.uuid)
         return record
     
     def get_record(self, pos: int):
@@ -213,9 +341,13 @@ class UserSession:
         Raises:
             IndexError: When position is out of bounds
         """
+        if self._last_record is not None and pos == self._last_pos:
+            return self._last_record
+        
         if not self.history_records:
             raise IndexError("No history records available")
         
+        requested_pos = pos
         # Handle negative indices for convenient access
         if pos < 0:
             pos = len(self.history_records) + pos
@@ -223,7 +355,10 @@ class UserSession:
         if pos < 0 or pos >= len(self.history_records):
             raise IndexError(f"Record position {pos} out of range (0-{len(self.history_records)-1})")
         
-        return self.history_records[pos]
+        record = self.history_records[pos]
+        self._last_pos = requested_pos
+        self._last_record = record
+        return record
     
     def get_record_safe(self, pos: int):
         """Safely get record, return None if failed"""
@@ -232,60 +367,80 @@ class UserSession:
         except (IndexError, TypeError):
             return None
     
-    def get_all_records(self):
-        """Get all history records"""
-        return self.history_records
+    def get_all_records(self) -> Sequence:
+        """Get a read-only view of all history records"""
+        return _ReadOnlyList(self.history_records)
     
     def get_current_record(self):
         """Get current active record"""
-        if self.current_pos >= 0 and self.current_pos < len(self.history_records):
-            return self.history_records[self.current_pos]
-        elif self.history_records:
-            self.current_pos = len(self.history_records) - 1
-            return self.history_records[self.current_pos]
-        return None
+        return self._current_record
     
     def set_current_pos(self, pos: int):
         """Set current active record position"""
         if 0 <= pos < len(self.history_records):
             self.current_pos = pos
-            self.updated_at = datetime.now().isoformat()
-            logging.info(f"Set current pos to {pos} for session {self.uuid}")
+            self._current_record = self.history_records[pos]
+            self.updated_at = _now_iso()
+            logger.info("Set current pos to %s for session %s", pos, self.uuid)
             return True
         return False
     
     def get_current_pos(self):
         """Get current active record position"""
-        if not self.history_records:
-            return -1
-        if self.current_pos < 0 or self.current_pos >= len(self.history_records):
-            self.current_pos = len(self.history_records) - 1
         return self.current_pos
     
+    @staticmethod
+    def _summarize_record(pos: int, record: HistoryRecord, is_current: bool) -> Dict:
+        """Build the summary dict of a single history record"""
+        outline = record.outline
+        article_count = len(record.article)
+        return {
+            'pos': pos,
+            'timestamp': record.timestamp,
+            'ts_ns': record.ts_ns,
+            'topic': record.topic, 
+            'has_topic': bool(record.topic), 
+            'has_outline': bool(outline),
+            'has_article': article_count > 0,  
+            'article_count': article_count,  
+            'outline_preview': outline[:100] + "..." if len(outline) > 100 else outline,
+            'is_current': is_current
+        }
+    
+    def iter_records_summary(self) -> Iterator[Dict]:
+        """Lazily yield history records summary information"""
+        current_pos = self.current_pos
+        summarize = self._summarize_record
+        return (summarize(i, record, i == current_pos) for i, record in enumerate(self.history_records))
+    
     def get_records_summary(self):
         """Get history records summary information"""
-        records = []
-        for i, record in enumerate(self.history_records):
-            outline_preview = record.outline[:100] + "..." if len(record.outline) > 100 else record.outline
-            records.append({
-                'pos': i,
-                'timestamp': record.timestamp,
-                'topic': record.topic, 
-                'has_topic': bool(record.topic), 
-                'has_outline': bool(record.outline),
-                'has_article': bool(record.article) and len(record.article) > 0,  
-                'article_count': len(record.article),  
-                'outline_preview': outline_preview,
-                'is_current': i == self.current_pos
-            })
-        return records
+        return list(self.iter_records_summary())
+    
+    # Writers for a record already in hand; callers are responsible for resolving it
+    
+    def _apply_topic(self, record: HistoryRecord, topic: str):
+        record.topic = topic
+        self.updated_at = _now_iso()
+    
+    def _apply_outline(self, record: HistoryRecord, outline: str):
+        record.outline = outline
+        self.updated_at = _now_iso()
+    
+    def _apply_article(self, record: HistoryRecord, article: str):
+        record.article += (article,)
+        record._article_text = None
+        self.updated_at = _now_iso()
+    
+    def _apply_articles(self, record: HistoryRecord, articles: List[str]):
+        record.article = tuple(articles)
+        record._article_text = None
+        self.updated_at = _now_iso()
     
     def update_record_topic(self, pos: int, topic: str):
         """Update topic of specified record"""
         try:
-            record = self.get_record(pos)
-            record.topic = topic
-            self.updated_at = datetime.now().isoformat()
+            self._apply_topic(self.get_record(pos), topic)
             return True
         except IndexError:
             return False
@@ -293,9 +448,7 @@ class UserSession:
     def update_record_outline(self, pos: int, outline: str):
         """Update outline of specified record"""
         try:
-            record = self.get_record(pos)
-            record.outline = outline
-            self.updated_at = datetime.now().isoformat()
+            self._apply_outline(self.get_record(pos), outline)
             return True
         except IndexError:
             return False
@@ -303,9 +456,7 @@ class UserSession:
     def update_record_article(self, pos: int, article: str):
         """Update article of specified record (append to list)"""
         try:
-            record = self.get_record(pos)
-            record.article.append(article)
-            self.updated_at = datetime.now().isoformat()
+            self._apply_article(self.get_record(pos), article)
             return True
         except IndexError:
             return False
@@ -313,60 +464,47 @@ class UserSession:
     def update_record_articles(self, pos: int, articles: List[str]):
         """Update article list of specified record (replace entire list)"""
         try:
-            record = self.get_record(pos)
-            record.article = articles
-            self.updated_at = datetime.now().isoformat()
+            self._apply_articles(self.get_record(pos), articles)
             return True
         except IndexError:
             return False
     
-    def update_record_references(self, pos: int, references: Dict):
+    def update_record_references(self, pos: int, references: Dict, format_hint: Optional[str] = None):
         """Update reference data of specified record
         
         references format: {chapter_index: {id: {content, title, url}}}
+        format_hint: REFS_CHAPTER_INDEXED or REFS_RAW to skip format detection
         """
         try:
             record = self.get_record(pos)
-            logging.info(f"Updating references for record at position {pos}")
+            logger.info("Updating references for record at position %s", pos)
             
-            # Check if references are already in chapter-indexed format
-            is_chapter_indexed = all(
-                isinstance(chapter_data, dict) and 
-                all(isinstance(ref_data, dict) for ref_data in chapter_data.values())
-                for chapter_data in references.values()
-            ) if references else False
+            # Validate chapter-indexed format and normalize keys in one pass
+            if format_hint == REFS_RAW:
+                normalized_refs = None
+            else:
+                normalized_refs = _normalize_chapter_references(
+                    references, validate=format_hint != REFS_CHAPTER_INDEXED
+                )
             
-            if is_chapter_indexed:
+            if normalized_refs is not None:
                 # If already in chapter-indexed format {chapter_index: {id: {content, title, url}}}
-                logging.info("References are already in chapter-indexed format")
+                logger.info("References are already in chapter-indexed format")
                 
                 if not isinstance(record.references, dict):
                     record.references = {}
                 
-                # Convert string keys to integer keys (if possible)
-                normalized_refs = {}
-                for chapter_idx, chapter_refs in references.items():
-                    # Try to convert chapter_idx to integer
-                    try:
-                        idx = int(chapter_idx)
-                    except (ValueError, TypeError):
-                        idx = chapter_idx
-                        
-                    normalized_refs[idx] = chapter_refs
-                
                 # Merge reference data
                 for chapter_idx, chapter_refs in normalized_refs.items():
-                    if chapter_idx not in record.references:
-                        record.references[chapter_idx] = {}
-                    record.references[chapter_idx].update(chapter_refs)
+                    record.references.setdefault(chapter_idx, {}).update(chapter_refs)
             else:
-                logging.warning("References are not in expected format, saving as-is")
+                logger.warning("References are not in expected format, saving as-is")
                 record.references = references
                 
-            self.updated_at = datetime.now().isoformat()
+            self.updated_at = _now_iso()
             return True
         except IndexError:
-            logging.error(f"Record at position {pos} not found")
+            logger.error("Record at position %s not found", pos)
             return False
     
     def update_record_chapter_references(self, pos: int, chapter_index: int, chapter_references: Dict):
@@ -382,7 +520,7 @@ class UserSession:
         """
         try:
             record = self.get_record(pos)
-            logging.info(f"Updating references for chapter {chapter_index} in record at position {pos}")
+            logger.info("Updating references for chapter %s in record at position %s", chapter_index, pos)
             
             if not isinstance(record.references, dict):
                 record.references = {}
@@ -396,26 +534,27 @@ class UserSession:
             # Update reference data for this chapter
             record.references[chapter_idx] = chapter_references
             
-            self.updated_at = datetime.now().isoformat()
-            logging.info(f"Successfully updated references for chapter {chapter_index} in record at position {pos}")
+            self.updated_at = _now_iso()
+            logger.info("Successfully updated references for chapter %s in record at position %s", chapter_index, pos)
             return True
         except IndexError:
-            logging.error(f"Record at position {pos} not found")
+            logger.error("Record at position %s not found", pos)
             return False
     
-    def get_record_articles(self, pos: int) -> List[str]:
-        """Get article list of specified record"""
+    def get_record_articles(self, pos: int) -> Tuple[str, ...]:
+        """Get the (immutable) article chapters of specified record
+        
+        Copy it with list() before modifying and write back via update_record_articles.
+        """
         try:
-            record = self.get_record(pos)
-            return record.article
+            return self.get_record(pos).article
         except IndexError:
-            return []
+            return ()
     
     def get_record_article_text(self, pos: int) -> str:
         """Get article text of specified record (merge all articles)"""
         try:
-            record = self.get_record(pos)
-            return '\n\n'.join(record.article)
+            return self.get_record(pos).article_text()
         except IndexError:
             return ""
             
@@ -426,34 +565,71 @@ class UserSession:
         """
         try:
             record = self.get_record(pos)
-            logging.info(f"Getting chapter references for chapter {chapter_index} from record at position {pos}")
+            logger.info("Getting chapter references for chapter %s from record at position %s", chapter_index, pos)
+            
+            if record.references is None:
+                return {}
             
             if not isinstance(record.references, dict):
-                logging.warning(f"References in record at position {pos} is not a dictionary")
+                logger.warning("References in record at position %s is not a dictionary", pos)
                 return {}
                 
-            if chapter_index in record.references:
-                logging.info(f"Found references for chapter {chapter_index}")
-                return record.references[chapter_index]
-            
-            if str(chapter_index) in record.references:
-                logging.info(f"Found references for chapter {str(chapter_index)}")
-                return record.references[str(chapter_index)]
+            # One probe per key form; hits return the stored dict itself, no copy
+            chapter_refs = record.references.get(chapter_index)
+            if chapter_refs is None:
+                chapter_refs = record.references.get(str(chapter_index))
+            if chapter_refs is not None:
+                logger.info("Found references for chapter %s", chapter_index)
+                return chapter_refs
             
             # If no direct match found for chapter index, return empty dict
-            logging.info(f"No references found for chapter {chapter_index}")
+            logger.info("No references found for chapter %s", chapter_index)
             return {}
             
         except IndexError:
-            logging.error(f"Record at position {pos} not found")
+            logger.error("Record at position %s not found", pos)
             return {}
         except Exception as e:
-            logging.error(f"Error retrieving chapter references: {e}")
+            logger.error("Error retrieving chapter references: %s", e)
             return {}
 
+class SessionHandle:
+    """
+    Read accessors bound to one resolved session.
+    
+    Obtained from UUIDManager.handle(); chained reads against the same
+    session skip the per-call UUID lookup of the *_by_session_and_pos methods.
+    """
+    
+    __slots__ = ('_session',)
+    
+    def __init__(self, user_session: UserSession):
+        self._session = user_session
+    
+    @property
+    def session(self) -> UserSession:
+        return self._session
+    
+    def outline(self, pos: int) -> Optional[str]:
+        record = self._session.get_record_safe(pos)
+        return record.outline if record else None
+    
+    def article(self, pos: int) -> Optional[Tuple[str, ...]]:
+        record = self._session.get_record_safe(pos)
+        return record.article if record else None
+    
+    def article_text(self, pos: int) -> Optional[str]:
+        record = self._session.get_record_safe(pos)
+        return (record.article_text() or None) if record else None
+    
+    def chapter_references(self, pos: int, chapter_index: int) -> Dict:
+        return self._session.get_record_chapter_references(pos, chapter_index)
+
 class UUIDManager:
-    def __init__(self):
-        self.user_sessions: List[UserSession] = []
+    def __init__(self, max_sessions: int = 50):
+        # uuid -> UserSession, least recently used first; bounded by max_sessions
+        self.user_sessions: 'OrderedDict[str, UserSession]' = OrderedDict()
+        self.max_sessions = max_sessions
         self.session_id = ""
         self.users: Dict[str, User] = {}  # email -> User mapping
         self.current_user = None  # Current logged in user
@@ -461,16 +637,16 @@ class UUIDManager:
     def create_user(self, email: str, password: str) -> Optional[User]:
         """Create new user"""
         if not email or not password:
-            logging.error("Email and password are required for user creation")
+            logger.error("Email and password are required for user creation")
             return None
             
         if email in self.users:
-            logging.warning(f"User with email {email} already exists")
+            logger.warning("User with email %s already exists", email)
             return None
         
         user = User(email, password)
         self.users[email] = user
-        logging.info(f"Created new user: {email}")
+        logger.info("Created new user: %s", email)
         return user
     
     def get_user_by_email(self, email: str) -> Optional[User]:
@@ -485,9 +661,9 @@ class UUIDManager:
             self.current_user = user
             session['session_id'] = user.email
             self.session_id = user.email
-            logging.info(f"User {email} authenticated successfully")
+            logger.info("User %s authenticated successfully", email)
             return user
-        logging.warning(f"Authentication failed for user {email}")
+        logger.warning("Authentication failed for user %s", email)
         return None
     
     def login_user(self, user: User):
@@ -497,13 +673,13 @@ class UUIDManager:
             self.current_user = user
             session['session_id'] = user.email
             self.session_id = user.email
-            logging.info(f"User {user.email} logged in and session created")
+            logger.info("User %s logged in and session created", user.email)
     
     def logout_current_user(self):
         """Logout current user"""
         if self.current_user:
             self.current_user.logout()
-            logging.info(f"User {self.current_user.email} logged out")
+            logger.info("User %s logged out", self.current_user.email)
             self.current_user = None
         
         # Clear session_id from session
@@ -532,49 +708,105 @@ class UUIDManager:
         Check user session, if user is logged in use user email as session_id
         If not logged in create anonymous session
         """
+        current_user = self.current_user
         # If there is current user, use user email as session_id
-        if self.current_user and self.current_user.is_authenticated:
-            session['session_id'] = self.current_user.email
-            self.session_id = self.current_user.email
-        elif 'session_id' not in session:
-            # Create anonymous session
-            session['session_id'] = str(uuid_lib.uuid4())
-            
-        self.session_id = session['session_id']
-
-        for user_session in self.user_sessions:
-            if user_session.uuid == self.session_id:
-                logging.info(f"User session found for uuid: {self.session_id}")
-                return user_session
+        if current_user and current_user.is_authenticated:
+            if current_user.session is not None and self.session_id == current_user.email:
+                self.user_sessions.move_to_end(self.session_id)
+                return current_user.session
+            if self.session_id != current_user.email:
+                session['session_id'] = current_user.email
+                self.session_id = current_user.email
+            # Already bound to this user: skip the Flask session round-trip
+        else:
+            if 'session_id' not in session:
+                # Create anonymous session
+                session['session_id'] = str(uuid_lib.uuid4())
+            self.session_id = session['session_id']
 
-        logging.info(f"Creating new user session for uuid: {self.session_id}")
-        new_user_session = UserSession(self.session_id)
-        self.user_sessions.append(new_user_session)
-        return new_user_session
-    
-    def get_session_by_uuid(self, uuid: str) -> Optional[UserSession]:
-        """Get user session by UUID"""
-        for user_session in self.user_sessions:
-            if user_session.uuid == uuid:
-                return user_session
-        return None
+        user_session = self.get_session_by_uuid(self.session_id, touch=True)
+        if user_session is not None:
+            logger.info("User session found for uuid: %s", self.session_id)
+        else:
+            logger.info("Creating new user session for uuid: %s", self.session_id)
+            user_session = UserSession(self.session_id)
+            self._add_session(user_session)
+        
+        if current_user and current_user.is_authenticated and current_user.email == self.session_id:
+            current_user.session = user_session
+        return user_session
+    
+    def get_session_by_uuid(self, uuid: str, touch: bool = False) -> Optional[UserSession]:
+        """Get user session by UUID
+        
+        Lookups are read-only by default; pass touch=True to mark the session
+        as most recently used for LRU eviction.
+        """
+        user_session = self.user_sessions.get(uuid)
+        if touch and user_session is not None:
+            self.user_sessions.move_to_end(uuid)
+        return user_session
+    
+    def _add_session(self, user_session: UserSession):
+        """Register a new session, evicting the least recently used ones beyond max_sessions"""
+        self._put_session(user_session)
+        self._evict_overflow()
+    
+    def _put_session(self, user_session: UserSession):
+        """Insert or replace a session as the most recently used one"""
+        uuid = user_session.uuid
+        replaced = self.user_sessions.get(uuid)
+        self.user_sessions[uuid] = user_session
+        if replaced is None:
+            return
+        # Assigning to an existing key keeps its old position
+        self.user_sessions.move_to_end(uuid)
+        user = self.users.get(uuid)
+        if user is not None and user.session is replaced:
+            user.session = user_session
+    
+    def bulk_load(self, sessions: List[UserSession]):
+        """Register many sessions at once (e.g. on restore), least recently used first"""
+        # Only the newest max_sessions could survive, so don't insert the rest at all
+        if len(sessions) > self.max_sessions:
+            sessions = sessions[len(sessions) - self.max_sessions:]
+        if self.user_sessions:
+            # Re-loaded sessions become most recently used and replace their users' links
+            for user_session in sessions:
+                self._put_session(user_session)
+        else:
+            # Build the table in one pass instead of growing it item by item
+            self.user_sessions = OrderedDict((s.uuid, s) for s in sessions)
+        self._evict_overflow()
+    
+    def _evict_overflow(self):
+        """Evict least recently used sessions beyond max_sessions"""
+        while len(self.user_sessions) > self.max_sessions:
+            self._unlink_session(*self.user_sessions.popitem(last=False))
+    
+    def _unlink_session(self, uuid: str, evicted: UserSession):
+        """Drop the owning user's link to an evicted session"""
+        user = self.users.get(uuid)
+        if user is not None and user.session is evicted:
+            user.session = None
     
     def get_current_session(self) -> Optional[UserSession]:
         """Get current session"""
         return self.check_uuid()
     
-    def list_all_records(self) -> List[Dict]:
-        """List all records from all sessions"""
-        all_records = []
-        for user_session in self.user_sessions:
-            session_records = user_session.get_records_summary()
-            for record in session_records:
-                record['session_uuid'] = user_session.uuid
-                all_records.append(record)
+    def list_all_records(self, limit: Optional[int] = None) -> List[Dict]:
+        """List records from all sessions, newest first (only the most recent limit if given)"""
+        def iter_all_records():
+            for user_session in self.user_sessions.values():
+                session_uuid = user_session.uuid
+                for record in user_session.iter_records_summary():
+                    record['session_uuid'] = session_uuid
+                    yield record
         
-        # Sort by timestamp, newest first
-        all_records.sort(key=lambda x: x['timestamp'], reverse=True)
-        return all_records
+        # Newest first; a bounded heap avoids sorting every record when only the top ones are shown
+        if limit is None:
+            return sorted(iter_all_records(), key=_RECORD_AGE_KEY, reverse=True)
+        return heapq.nlargest(limit, iter_all_records(), key=_RECORD_AGE_KEY)
     
     def get_record_by_session_and_pos(self, session_uuid: str, pos: int) -> Optional[HistoryRecord]:
         """Get record by session UUID and position"""
@@ -596,12 +828,11 @@ class UUIDManager:
         if current_session:
             current_record = current_session.get_current_record()
             if current_record:
-                current_record.topic = topic
-                current_session.updated_at = datetime.now().isoformat()
+                current_session._apply_topic(current_record, topic)
                 return True
             else:
                 # If no current record, don't auto-create, wait for other places to create record then save
-                logging.info(f"No current record found, topic will be saved when record is created: {topic[:50]}...")
+                logger.info("No current record found, topic will be saved when record is created: %s...", topic[:50])
                 return False
         return False
     
@@ -611,8 +842,7 @@ class UUIDManager:
         if current_session:
             current_record = current_session.get_current_record()
             if current_record:
-                current_record.outline = outline
-                current_session.updated_at = datetime.now().isoformat()
+                current_session._apply_outline(current_record, outline)
                 return True
             else:
                 # If no current record, create a new one
@@ -627,13 +857,12 @@ class UUIDManager:
         if current_session:
             current_record = current_session.get_current_record()
             if current_record:
-                current_record.article.append(article)
-                current_session.updated_at = datetime.now().isoformat()
+                current_session._apply_article(current_record, article)
                 return True
             else:
                 # If no current record, create a new one
                 new_record = current_session.create_record()
-                new_record.article.append(article)
+                current_session._apply_article(new_record, article)
                 return True
         return False
     
@@ -643,58 +872,49 @@ class UUIDManager:
         if current_session:
             current_record = current_session.get_current_record()
             if current_record:
-                current_record.article = articles
-                current_session.updated_at = datetime.now().isoformat()
+                current_session._apply_articles(current_record, articles)
                 return True
             else:
                 # If no current record, create a new one
                 new_record = current_session.create_record()
-                new_record.article = articles
+                current_session._apply_articles(new_record, articles)
                 return True
         return False
     
-    def save_references_to_current_pos(self, references: Dict) -> bool:
+    def save_references_to_current_pos(self, references: Dict, format_hint: Optional[str] = None) -> bool:
         """Save reference data to current position of current session
         
         references format: {chapter_index: {id: {content, title, url}}}
+        format_hint: REFS_CHAPTER_INDEXED, REFS_FLAT_WITH_INDEX or REFS_RAW to skip format detection
         """
         current_session = self.get_current_session()
         if current_session:
             current_record = current_session.get_current_record()
             if current_record:
-                # Check if references are already in chapter-indexed format
-                is_chapter_indexed = all(
-                    isinstance(chapter_data, dict) and 
-                    all(isinstance(ref_data, dict) for ref_data in chapter_data.values())
-                    for chapter_data in references.values()
-                ) if references else False
+                # Validate chapter-indexed format and normalize keys in one pass
+                if format_hint is None or format_hint == REFS_CHAPTER_INDEXED:
+                    normalized_refs = _normalize_chapter_references(
+                        references, validate=format_hint is None
+                    )
+                else:
+                    normalized_refs = None
                 
-                if is_chapter_indexed:
+                if normalized_refs is not None:
                     # If already in chapter-indexed format {chapter_index: {id: {content, title, url}}}
-                    logging.info("References are already in chapter-indexed format")
+                    logger.info("References are already in chapter-indexed format")
                     
                     if not isinstance(current_record.references, dict):
                         current_record.references = {}
                     
-                    # Convert string keys to integer keys (if possible)
-                    normalized_refs = {}
-                    for chapter_idx, chapter_refs in references.items():
-                        # Try to convert chapter_idx to integer
-                        try:
-                            idx = int(chapter_idx)
-                        except (ValueError, TypeError):
-                            idx = chapter_idx
-                            
-                        normalized_refs[idx] = chapter_refs
-                    
                     # Merge reference data
                     for chapter_idx, chapter_refs in normalized_refs.items():
-                        if chapter_idx not in current_record.references:
-                            current_record.references[chapter_idx] = {}
-                        current_record.references[chapter_idx].update(chapter_refs)
-                elif any(isinstance(ref, dict) and 'index' in ref for ref in references.values()):
+                        current_record.references.setdefault(chapter_idx, {}).update(chapter_refs)
+                elif format_hint == REFS_FLAT_WITH_INDEX or (
+                    format_hint is None
+                    and any(isinstance(ref, dict) and 'index' in ref for ref in references.values())
+                ):
                     # Handle old format: {id: {content, title, url, index}}
-                    logging.info("Processing references with index field")
+                    logger.info("Processing references with index field")
                     
                     if not isinstance(current_record.references, dict):
                         current_record.references = {}
@@ -703,42 +923,55 @@ class UUIDManager:
                     for ref_id, ref_data in references.items():
                         chapter_index = ref_data.get('index')
                         if chapter_index is not None:
-                            if chapter_index not in current_record.references:
-                                current_record.references[chapter_index] = {}
                             # Create a copy of reference data without index field
                             ref_copy = {k: v for k, v in ref_data.items() if k != 'index'}
-                            current_record.references[chapter_index][ref_id] = ref_copy
+                            current_record.references.setdefault(chapter_index, {})[ref_id] = ref_copy
                 else:
                     # Handle unknown format or empty references
-                    logging.warning("References format unknown or empty, saving as-is")
+                    logger.warning("References format unknown or empty, saving as-is")
                     current_record.references = references
                 
-                current_session.updated_at = datetime.now().isoformat()
+                current_session.updated_at = _now_iso()
                 return True
             else:
                 # If no current record, create a new one
-                logging.info("Creating new record for references")
+                logger.info("Creating new record for references")
                 new_record = current_session.create_record()
                 # Use the same logic to handle reference data
-                return self.save_references_to_current_pos(references)
+                return self.save_references_to_current_pos(references, format_hint)
         return False
             
 
     
+    def handle(self, session_uuid: str) -> Optional[SessionHandle]:
+        """Resolve a session once for several reads, or None if it does not exist"""
+        user_session = self.get_session_by_uuid(session_uuid)
+        return SessionHandle(user_session) if user_session is not None else None
+    
     def get_outline_by_session_and_pos(self, session_uuid: str, pos: int) -> Optional[str]:
         """Get outline by session UUID and position"""
         record = self.get_record_by_session_and_pos(session_uuid, pos)
         return record.outline if record else None
     
-    def get_article_by_session_and_pos(self, session_uuid: str, pos: int) -> Optional[List[str]]:
+    def get_article_by_session_and_pos(self, session_uuid: str, pos: int) -> Optional[Tuple[str, ...]]:
         """Get article list by session UUID and position"""
         record = self.get_record_by_session_and_pos(session_uuid, pos)
         return record.article if record else None
     
+    def get_articles_by_session_and_positions(self, session_uuid: str,
+                                              positions: List[int]) -> List[Optional[Tuple[str, ...]]]:
+        """Get article lists for several positions of one session, resolving the session once"""
+        user_session = self.get_session_by_uuid(session_uuid)
+        if user_session is None:
+            return [None] * len(positions)
+        get_record = user_session.get_record_safe
+        return [record.article if record else None for record in map(get_record, positions)]
+    
     def get_article_text_by_session_and_pos(self, session_uuid: str, pos: int) -> Optional[str]:
         """Get article text by session UUID and position (merge all articles)"""
         record = self.get_record_by_session_and_pos(session_uuid, pos)
-        return '\n\n'.join(record.article) if record and record.article else None
+        # An empty article joins to "", so one truthiness test covers both cases
+        return (record.article_text() or None) if record else None
         
     def get_chapter_references_by_session_and_pos(self, session_uuid: str, pos: int, chapter_index: int) -> Dict:
         """Get chapter reference data by session UUID, position and chapter index"""
@@ -748,13 +981,22 @@ class UUIDManager:
         return {}
     
     def cleanup_old_sessions(self, max_sessions: int = 50):
-        """Clean up old sessions"""
-        if len(self.user_sessions) > max_sessions:
-            # Sort by update time, keep newest ones
-            self.user_sessions.sort(key=lambda x: x.updated_at, reverse=True)
-            removed_count = len(self.user_sessions) - max_sessions
-            self.user_sessions = self.user_sessions[:max_sessions]
-            logging.info(f"Cleaned up {removed_count} old sessions")
+        """Clean up old sessions
+        
+        Sessions are already bounded by max_sessions with LRU eviction on insert;
+        this only matters when shrinking below that bound.
+        """
+        n = len(self.user_sessions)
+        if n <= max_sessions:
+            return
+        # Keep the newest ones; a bounded heap avoids sorting every session
+        kept_uuids = {s.uuid for s in heapq.nlargest(max_sessions, self.user_sessions.values(), key=_SESSION_AGE_KEY)}
+        evicted = [(uuid, s) for uuid, s in self.user_sessions.items() if uuid not in kept_uuids]
+        # Delete in place: survivors keep their LRU order and no new table is built
+        for uuid, user_session in evicted:
+            del self.user_sessions[uuid]
+            self._unlink_session(uuid, user_session)
+        logger.info("Cleaned up %d old sessions", n - max_sessions)
 
 
     
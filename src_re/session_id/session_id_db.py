@@ -1,20 +1,86 @@
 from __future__ import annotations
 
 import logging
+import time
 import uuid as uuid_lib
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Generator, Tuple, TypeVar
 
 from flask import session
 from flask_login import current_user
 
 from database.session_manager import get_db_manager
-from database.dao import SessionDAO, HistoryDAO, GenerationDAO
+from database.dao import SessionDAO, HistoryDAO, GenerationDAO, UserDAO
 from database.models import HistoryRecordDB, ConversationMessageDB
+from sqlalchemy import text
+from sqlalchemy.orm import Session
 
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar('T')
+
+# Bounds of the in-process UserSession cache; the database remains the source of truth
+SESSION_CACHE_SIZE = 1024
+SESSION_CACHE_TTL = 600  # Seconds a cached session may stay idle before it is reloaded
+
+# SQL used by UserSession._migrate_user_history, built once at import time
+_SQL_TRY_MIGRATION_LOCK = text("SELECT pg_try_advisory_xact_lock(hashtext(:email))")
+
+# Sessions owned by the user plus session_uuids containing the email (backup method)
+_SQL_USER_SESSIONS = text("""
+    SELECT uuid 
+    FROM user_sessions 
+    WHERE owner_user_id = :user_id AND uuid != :current_uuid
+    UNION
+    SELECT session_uuid 
+    FROM history_records 
+    WHERE session_uuid LIKE :pattern AND session_uuid != :current_uuid
+    ORDER BY 1
+""")
+
+# Link orphaned history sessions whose uuid contains the email's local part to the user
+_SQL_LINK_ORPHANED_SESSIONS = text("""
+    INSERT INTO user_sessions (uuid, max_history, status, lock_version, owner_user_id, created_at, updated_at)
+    SELECT DISTINCT hr.session_uuid, 30, 'active', 0, :user_id, NOW(), NOW()
+    FROM history_records hr 
+    LEFT JOIN user_sessions us ON hr.session_uuid = us.uuid 
+    WHERE us.uuid IS NULL AND hr.session_uuid != :current_uuid
+      AND strpos(hr.session_uuid, :local_part) > 0
+    ON CONFLICT (uuid) DO UPDATE SET owner_user_id = EXCLUDED.owner_user_id
+    RETURNING uuid
+""")
+
+_SQL_MIGRATE_HISTORY_RECORDS = text("""
+    UPDATE history_records 
+    SET session_uuid = :new_uuid 
+    WHERE session_uuid = ANY(:old_uuids)
+""")
+
+_SQL_MIGRATE_USER_SESSIONS = text("""
+    UPDATE user_sessions 
+    SET uuid = :new_uuid 
+    WHERE uuid = ANY(:old_uuids) AND uuid != :new_uuid
+""")
+
+_SQL_MARK_MIGRATION_DONE = text("UPDATE user_sessions SET migration_done = TRUE WHERE uuid = :uuid")
+
+# Database session shared by writers inside UserSession.transaction()
+_ambient_db_session: ContextVar[Optional[Session]] = ContextVar('_ambient_db_session', default=None)
+
+
+def _message_to_dict(msg: ConversationMessageDB) -> Dict[str, Any]:
+    """Convert a conversation message row to the in-memory message format"""
+    return {
+        'role': msg.role,
+        'content': msg.content,
+        'timestamp': msg.timestamp.isoformat(),
+        'message_id': msg.message_id,
+    }
+
 
 class HistoryRecord:
     """History record structure (compatible with original interface)
@@ -22,14 +88,25 @@ class HistoryRecord:
     Now serves as a wrapper for database records, maintaining the original interface unchanged.
     """
     
-    def __init__(self, db_record: Optional[HistoryRecordDB] = None):
+    __slots__ = ('_db_record', '_messages', 'topic', 'outline', '_article', '_references',
+                 'timestamp', '_record_id')
+    
+    def __init__(self, db_record: Optional[HistoryRecordDB] = None,
+                 db_messages: Optional[List[ConversationMessageDB]] = None,
+                 lite: bool = False):
         if db_record:
             self._db_record = db_record
-            self._messages = None  
+            # Messages batch-loaded by the caller skip the per-record lazy query
+            self._messages = [_message_to_dict(msg) for msg in db_messages] if db_messages is not None else None
             self.topic = db_record.topic or ""  
             self.outline = db_record.outline or ""
-            self.article = db_record.article_chapters or []
-            self.references = db_record.references_data or {}
+            if lite:
+                # Row loaded without the JSON columns; they are fetched on first access
+                self._article = None
+                self._references = None
+            else:
+                self._article = db_record.article_chapters or []
+                self._references = db_record.references_data or {}
             self.timestamp = db_record.created_at.isoformat()
             self._record_id = db_record.id
         else:
@@ -37,11 +114,52 @@ class HistoryRecord:
             self._messages = []
             self.topic = ""
             self.outline = ""
-            self.article = []
-            self.references = {}
+            self._article = []
+            self._references = {}
             self.timestamp = datetime.now().isoformat()
             self._record_id = None
     
+    def _load_content(self):
+        """Load article chapters and references of a lite record (lazy loading)"""
+        article, references = None, None
+        if self.db_record_id:
+            try:
+                db_manager = get_db_manager()
+                with db_manager.get_readonly_session() as db_session:
+                    content = HistoryDAO.get_record_content(db_session, self.db_record_id)
+                if content:
+                    article, references = content
+            except Exception as e:
+                logger.error("Error loading content for record %s: %s", self.db_record_id, e)
+        if self._article is None:
+            self._article = article or []
+        if self._references is None:
+            self._references = references or {}
+    
+    @property
+    def article(self) -> List[str]:
+        """Get article chapter list (lazy loading)"""
+        if self._article is None:
+            self._load_content()
+        return self._article
+    
+    @article.setter
+    def article(self, value: List[str]):
+        """Set article chapter list"""
+        self._article = value
+    
+    @property
+    def references(self) -> Dict:
+        """Get references data (lazy loading)"""
+        if self._references is None:
+            self._load_content()
+        return self._references
+    
+    @references.setter
+    def references(self, value: Dict):
+        """Set references data"""
+        self._references = value
+    
     @property
     def messages(self) -> List:
         """Get message list (lazy loading)"""
@@ -51,17 +169,9 @@ class HistoryRecord:
                 db_manager = get_db_manager()
                 with db_manager.get_readonly_session() as db_session:
                     db_messages = HistoryDAO.get_record_messages(db_session, self.db_record_id)
-                    self._messages = [
-                        {
-                            'role': msg.role,
-                            'content': msg.content,
-                            'timestamp': msg.timestamp.isoformat(),
-                            'message_id': msg.message_id,
-                        }
-                        for msg in db_messages
-                    ]
+                    self._messages = [_message_to_dict(msg) for msg in db_messages]
             except Exception as e:
-                logger.error(f"Error loading messages for record {self.db_record_id}: {e}")
+                logger.error("Error loading messages for record %s: %s", self.db_record_id, e)
                 self._messages = []
         elif self._messages is None:
             self._messages = []
@@ -93,18 +203,23 @@ class UserSession:
     def __init__(self, uuid: str):
         self.uuid = uuid
         self.max_history = 30
-        self._current_pos = -1
+        # Resolved once per session instead of on every database access
+        self._db_manager = get_db_manager()
         self._created_at = None
         self._updated_at = None
         self._db_session = None
         self._history_records_cache = None
+        self._cache_version = None
+        self.last_accessed = time.monotonic()
+        # Old session UUIDs merged into this one by _migrate_user_history
+        self.migrated_session_uuids: List[str] = []
         
         # Load or create session from database
         self._load_or_create_session()
     
     def _load_or_create_session(self):
         """Load or create session from database"""
-        db_manager = get_db_manager()
+        db_manager = self._db_manager
         with db_manager.get_session() as db_session:
             db_session_obj = SessionDAO.get_or_create_session(
                 db_session, self.uuid, self.max_history
@@ -115,8 +230,8 @@ class UserSession:
             self._updated_at = db_session_obj.updated_at.isoformat()
             self._current_record_id = db_session_obj.current_record_id  
             
-            # History record migration
-            if '@' in self.uuid:
+            # History record migration (skipped once it has completed for this session)
+            if '@' in self.uuid and not db_session_obj.migration_done:
                 self._migrate_user_history(db_session)
     
     @property
@@ -129,31 +244,27 @@ class UserSession:
     
     @property
     def current_pos(self) -> int:
-        """Get current position"""
+        """Get current position
+        
+        current_record_id is re-read from user_sessions on every call, so a record
+        selected by another worker is picked up instead of a stale cached position.
+        """
         try:
-            # Use stored current_record_id, reload if not exists
-            current_record_id = getattr(self, '_current_record_id', None)
-            if not current_record_id:
-                # Reload current_record_id from database
-                db_manager = get_db_manager()
+            ambient = _ambient_db_session.get()
+            if ambient is not None:
+                # Inside transaction(): see the block's own uncommitted writes
+                found = HistoryDAO.get_record_position(ambient, self.uuid)
+            else:
+                db_manager = self._db_manager
                 with db_manager.get_readonly_session() as db_session:
-                    session_obj = SessionDAO.get_session_by_uuid(db_session, self.uuid)
-                    if session_obj:
-                        current_record_id = session_obj.current_record_id
-                        self._current_record_id = current_record_id  # Cache result
+                    found = HistoryDAO.get_record_position(db_session, self.uuid)
             
-            if current_record_id:
-                # Calculate position based on current_record_id
-                db_manager = get_db_manager()
-                with db_manager.get_readonly_session() as db_session:
-                    records = HistoryDAO.get_session_records(db_session, self.uuid)
-                    for i, record in enumerate(records):
-                        if record.id == current_record_id:
-                            return i  
-            else:
-                logger.debug(f"No current_record_id for session {self.uuid}")
+            if found:
+                self._current_record_id, current_pos = found
+                return current_pos
+            logger.debug("No current record for session %s", self.uuid)
         except Exception as e:
-            logger.error(f"Error getting current pos for session {self.uuid}: {e}")
+            logger.error("Error getting current pos for session %s: %s", self.uuid, e)
         return -1
     
     @property
@@ -164,38 +275,99 @@ class UserSession:
         return self._history_records_cache
     
     def refresh_history_records(self):
-        """Force refresh history record cache (called after transaction commit)"""
+        """Refresh history record cache (called after transaction commit)
+        
+        The cache is only reloaded when the session's version token has changed.
+        """
+        if self._history_records_cache is not None:
+            try:
+                db_manager = self._db_manager
+                with db_manager.get_readonly_session() as db_session:
+                    version = SessionDAO.get_session_version(db_session, self.uuid)
+                if version is not None and version == self._cache_version:
+                    return self._history_records_cache
+            except Exception as e:
+                logger.error("Error checking cache version for session %s: %s", self.uuid, e)
         self._invalidate_cache()
         return self.history_records
     
     def _load_history_records(self):
         """Load history records from database"""
         try:
-            db_manager = get_db_manager()
+            db_manager = self._db_manager
             with db_manager.get_readonly_session() as db_session:
-                db_records = HistoryDAO.get_session_records(
+                # Read the version first so a concurrent write only causes an extra reload later
+                version = SessionDAO.get_session_version(db_session, self.uuid)
+                # Skip the article/references JSON blobs; records load them on first access
+                db_records = HistoryDAO.get_session_records_light(
                     db_session, self.uuid, limit=self.max_history
                 )
+                # Load messages of all records in one query instead of one per record
+                messages_by_record = HistoryDAO.get_messages_for_records(
+                    db_session, [db_record.id for db_record in db_records]
+                )
                 # Convert to HistoryRecord objects
                 self._history_records_cache = [
-                    HistoryRecord(db_record)
+                    HistoryRecord(db_record, messages_by_record.get(db_record.id, []), lite=True)
                     for db_record in db_records
                 ]
+                self._cache_version = version
         except Exception as e:
-            logger.error(f"Error loading history records for session {self.uuid}: {e}")
+            logger.error("Error loading history records for session %s: %s", self.uuid, e)
             self._history_records_cache = [] 
     
     def _invalidate_cache(self):
         """Invalidate cache"""
         self._history_records_cache = None
+        self._cache_version = None
+    
+    @contextmanager
+    def transaction(self) -> Generator[Session, None, None]:
+        """Run several record writes in one database transaction
+        
+        Writers called inside the block reuse the shared session instead of
+        opening (and committing) their own, and current_pos reads through it so
+        a record created in the block is seen. Nested calls join the outer transaction.
+        
+        Usage:
+            with user_session.transaction():
+                user_session.create_record()
+                user_session.update_record_outline(pos, outline)
+        """
+        ambient = _ambient_db_session.get()
+        if ambient is not None:
+            yield ambient
+            return
+        
+        db_manager = self._db_manager
+        token = _ambient_db_session.set(None)
+        try:
+            with db_manager.get_session() as db_session:
+                _ambient_db_session.set(db_session)
+                yield db_session
+        except Exception:
+            # In-memory records were updated before the rollback
+            self._invalidate_cache()
+            raise
+        finally:
+            _ambient_db_session.reset(token)
+    
+    def _with_session(self, operation: Callable[[Session], T]) -> T:
+        """Run operation on the ambient transaction session, or in a session of its own"""
+        db_session = _ambient_db_session.get()
+        if db_session is not None:
+            return operation(db_session)
+        
+        db_manager = self._db_manager
+        with db_manager.get_session() as db_session:
+            return operation(db_session)
     
     def _has_any_records(self) -> bool:
         """Check if current session has any history records"""
         try:
-            db_manager = get_db_manager()
+            db_manager = self._db_manager
             with db_manager.get_readonly_session() as db_session:
-                records = HistoryDAO.get_session_records(db_session, self.uuid, limit=1)
-                return len(records) > 0
+                return HistoryDAO.session_has_records(db_session, self.uuid)
         except Exception:
             return False
     
@@ -203,176 +375,112 @@ class UserSession:
         """Migrate user's history records to current email format session_uuid"""
         try:
             email = self.uuid
-            logger.info(f"Starting comprehensive history migration for user {email}")
             
-            # Method 1: Find all historical sessions of current user through user_sessions table
-            from sqlalchemy import text
-            from database.dao import UserDAO
+            # Serialize concurrent migrations of the same user (login/navigation races);
+            # the lock is released when the surrounding transaction ends
+            got_lock = db_session.execute(_SQL_TRY_MIGRATION_LOCK, {"email": email}).scalar()
+            if not got_lock:
+                logger.info("History migration for user %s already running, skipping", email)
+                return
+            
+            logger.info("Starting comprehensive history migration for user %s", email)
             
+            # Method 1: Find all historical sessions of current user through user_sessions table
             # First get user ID
             user = UserDAO.get_by_email(db_session, email)
             if not user:
-                logger.warning(f"User {email} not found in users table, skipping migration")
+                logger.warning("User %s not found in users table, skipping migration", email)
                 return
             
             user_id = user.id
-            logger.info(f"Found user {email} with ID {user_id}")
-            
-            # Find all sessions owned by this user
-            user_sessions_query = text("""
-                SELECT DISTINCT uuid 
-                FROM user_sessions 
-                WHERE owner_user_id = :user_id AND uuid != :current_uuid
-                ORDER BY uuid
-            """)
+            logger.info("Found user %s with ID %s", email, user_id)
             
-            existing_sessions = []
-            result = db_session.execute(user_sessions_query, {
+            # Find all sessions owned by this user, together with
+            # Method 2: session_uuid containing email (backup method), in one round trip
+            result = db_session.execute(_SQL_USER_SESSIONS, {
                 "user_id": user_id,
-                "current_uuid": email
-            })
-            for row in result:
-                existing_sessions.append(row[0])
-            
-            # Method 2: Find session_uuid containing email (backup method)
-            email_pattern_query = text("""
-                SELECT DISTINCT session_uuid 
-                FROM history_records 
-                WHERE session_uuid LIKE :pattern AND session_uuid != :current_uuid
-                ORDER BY session_uuid
-            """)
-            
-            result = db_session.execute(email_pattern_query, {
                 "pattern": f"%{email}%",
                 "current_uuid": email
             })
-            for row in result:
-                session_uuid = row[0]
-                if session_uuid not in existing_sessions:
-                    existing_sessions.append(session_uuid)
-            
-            # Method 3: Find orphaned history records (without corresponding user_sessions records)
-            orphaned_query = text("""
-                SELECT DISTINCT hr.session_uuid 
-                FROM history_records hr 
-                LEFT JOIN user_sessions us ON hr.session_uuid = us.uuid 
-                WHERE us.uuid IS NULL AND hr.session_uuid != :current_uuid
-                ORDER BY hr.session_uuid
-            """)
+            existing_sessions = [row[0] for row in result]
             
-            result = db_session.execute(orphaned_query, {"current_uuid": email})
-            orphaned_sessions = [row[0] for row in result]
+            # Method 3: Link orphaned history records (without corresponding user_sessions records)
+            # that possibly belong to current user (heuristic judgment: session_uuid contains the
+            # email's local part, which also covers the user_N_<email> forms) in a single statement
+            result = db_session.execute(_SQL_LINK_ORPHANED_SESSIONS, {
+                "user_id": user_id,
+                "current_uuid": email,
+                "local_part": email.split('@')[0]
+            })
+            linked_orphans = [row[0] for row in result]
             
-            if orphaned_sessions:
-                logger.info(f"Found {len(orphaned_sessions)} orphaned sessions: {orphaned_sessions}")
-                # Create user_sessions records for orphaned sessions
-                for orphaned_uuid in orphaned_sessions:
-                    # Check if it possibly belongs to current user (heuristic judgment)
-                    if (email.split('@')[0] in orphaned_uuid or 
-                        any(pattern in orphaned_uuid for pattern in [f"user_1_{email}", f"user_2_{email}", 
-                                                                      f"user_3_{email}", f"user_4_{email}", 
-                                                                      f"user_5_{email}"])):
-                        existing_sessions.append(orphaned_uuid)
-                        # Create user_sessions record
-                        create_session_query = text("""
-                            INSERT INTO user_sessions (uuid, max_history, owner_user_id, created_at, updated_at)
-                            VALUES (:uuid, 30, :user_id, NOW(), NOW())
-                            ON CONFLICT (uuid) DO UPDATE SET owner_user_id = :user_id
-                        """)
-                        db_session.execute(create_session_query, {
-                            "uuid": orphaned_uuid,
-                            "user_id": user_id
-                        })
-                        logger.info(f"Linked orphaned session {orphaned_uuid} to user {email}")
+            if linked_orphans:
+                logger.info("Linked %s orphaned sessions to user %s: %s", len(linked_orphans), email, linked_orphans)
+                existing_sessions = list(dict.fromkeys(existing_sessions + linked_orphans))
             
             if not existing_sessions:
-                logger.info(f"No history records found for migration for user {email}")
+                logger.info("No history records found for migration for user %s", email)
+                db_session.execute(_SQL_MARK_MIGRATION_DONE, {"uuid": email})
                 return
             
-            logger.info(f"Found {len(existing_sessions)} sessions to migrate: {existing_sessions}")
+            logger.info("Found %s sessions to migrate: %s", len(existing_sessions), existing_sessions)
             
-            # Migrate history records
-            migrated_count = 0
-            for old_session_uuid in existing_sessions:
-                update_query = text("""
-                    UPDATE history_records 
-                    SET session_uuid = :new_uuid 
-                    WHERE session_uuid = :old_uuid
-                """)
-                result = db_session.execute(update_query, {
-                    "new_uuid": email,
-                    "old_uuid": old_session_uuid
-                })
-                count = result.rowcount
-                migrated_count += count
-                logger.info(f"Migrated {count} records from {old_session_uuid} to {email}")
+            # Migrate history records of all old sessions in one statement
+            result = db_session.execute(_SQL_MIGRATE_HISTORY_RECORDS, {
+                "new_uuid": email,
+                "old_uuids": existing_sessions
+            })
+            migrated_count = result.rowcount
+            self.migrated_session_uuids = existing_sessions
             
             # Also migrate user_sessions table
-            session_update_query = text("""
-                UPDATE user_sessions 
-                SET uuid = :new_uuid 
-                WHERE uuid = :old_uuid AND uuid != :new_uuid
-            """)
-            for old_session_uuid in existing_sessions:
-                db_session.execute(session_update_query, {
-                    "new_uuid": email,
-                    "old_uuid": old_session_uuid
-                })
+            db_session.execute(_SQL_MIGRATE_USER_SESSIONS, {
+                "new_uuid": email,
+                "old_uuids": existing_sessions
+            })
             
-            logger.info(f"History migration completed: {migrated_count} total records migrated to {email}")
+            db_session.execute(_SQL_MARK_MIGRATION_DONE, {"uuid": email})
+            logger.info("History migration completed: %s total records migrated to %s", migrated_count, email)
             
             # Invalidate cache and reload
             self._invalidate_cache()
             
         except Exception as e:
-            logger.error(f"Error during history migration for {email}: {e}")
+            logger.error("Error during history migration for %s: %s", email, e)
             import traceback
-            logger.error(f"Migration traceback: {traceback.format_exc()}")
+            logger.error("Migration traceback: %s", traceback.format_exc())
             # Don't throw exception to avoid affecting normal session creation
     
     def create_record(self) -> HistoryRecord:
         """Create new history record"""
-        db_manager = get_db_manager()
-        with db_manager.get_session() as db_session:
-            # Create database record (position = current record count = append to end)
-            position = len(self.history_records)
-            db_record = HistoryDAO.create_history_record(
-                db_session, self.uuid, position
+        # Create database record (position = current record count = append to end)
+        position = len(self.history_records)
+        # Insert, update session's current record ID and clean up old records
+        # (maintain max history record count) in one statement
+        record_id, record_created_at, deleted_count = self._with_session(
+            lambda db_session: HistoryDAO.create_and_set_current(
+                db_session, self.uuid, position, self.max_history
             )
-            
-            # Update session's current record ID
-            SessionDAO.update_current_record(db_session, self.uuid, db_record.id)
-            
-            # Clean up old records (maintain max history record count)
-            HistoryDAO.cleanup_old_records(db_session, self.uuid, self.max_history)
-            
-            # Create record object within session, save necessary data
-            record_id = db_record.id
-            record_created_at = db_record.created_at
-            record_outline = db_record.outline or ""
-            record_article_chapters = db_record.article_chapters or []
-            record_references_data = db_record.references_data or {}
+        )
         
-        # Update current position to new record's position at end of queue (ascending: newest at end)
         if self._history_records_cache is None:
             self._history_records_cache = []
-        new_position = len(self._history_records_cache)  # Index after append
-        self._current_pos = new_position
-        self._current_record_id = record_id
         
         # Create record outside session to avoid binding issues, and update local cache (append to end)
         record = HistoryRecord()
-        record._db_record = None
-        record.topic = ""
-        record.outline = record_outline
-        record.article = record_article_chapters
-        record.references = record_references_data
         record.timestamp = record_created_at.isoformat()
         record._record_id = record_id
         
         self._history_records_cache.append(record)
+        # Drop the oldest records removed by cleanup so cached positions match the database
+        if deleted_count:
+            del self._history_records_cache[:deleted_count]
         
-        logger.info(f"Created new record id={record_id} at position {new_position} for session {self.uuid}")
+        # Update current position to new record's position at end of queue (ascending: newest at end)
+        new_position = len(self._history_records_cache) - 1
+        self._current_record_id = record_id
+        
+        logger.info("Created new record id=%s at position %s for session %s", record_id, new_position, self.uuid)
         return record
     
     def get_record(self, pos: int) -> HistoryRecord:
@@ -403,29 +511,35 @@ class UserSession:
     
     def get_current_record(self) -> Optional[HistoryRecord]:
         """Get current active record"""
+        return self.get_current_pos_and_record()[1]
+    
+    def get_current_pos_and_record(self) -> Tuple[int, Optional[HistoryRecord]]:
+        """Get current position and current active record with one position lookup
+        
+        The record falls back to the newest one while no position is set (pos -1).
+        """
         current_pos = self.current_pos
         if current_pos >= 0:
-            return self.get_record_safe(current_pos)
+            return current_pos, self.get_record_safe(current_pos)
         elif self.history_records:
-            return self.history_records[-1]  # Return newest record
-        return None
+            return current_pos, self.history_records[-1]  # Return newest record
+        return current_pos, None
     
     def set_current_pos(self, pos: int) -> bool:
-        """Set current active record position"""
-        records = self.history_records
-        if 0 <= pos < len(records):
-            record = records[pos]
-            if record.db_record_id:
-                db_manager = get_db_manager()
-                with db_manager.get_session() as db_session:
-                    success = SessionDAO.update_current_record(
-                        db_session, self.uuid, record.db_record_id
-                    )
-                    if success:
-                        self._current_pos = pos
-                        self._current_record_id = record.db_record_id  # Key fix: also update record_id cache
-                        logger.info(f"Set current pos to {pos} (record_id={record.db_record_id}) for session {self.uuid}")
-                        return True
+        """Set current active record position
+        
+        The record at pos is resolved by the database, so the history records
+        don't need to be loaded first.
+        """
+        if pos < 0:
+            return False
+        record_id = self._with_session(
+            lambda db_session: SessionDAO.update_current_record_by_pos(db_session, self.uuid, pos)
+        )
+        if record_id is not None:
+            self._current_record_id = record_id  # Key fix: also update record_id cache
+            logger.info("Set current pos to %s (record_id=%s) for session %s", pos, record_id, self.uuid)
+            return True
         return False
     
     def get_current_pos(self) -> int:
@@ -435,121 +549,100 @@ class UserSession:
     def get_records_summary(self) -> List[Dict]:
         """Get history record summary information"""
         try:
-            db_manager = get_db_manager()
+            db_manager = self._db_manager
             with db_manager.get_readonly_session() as db_session:
-                summaries = HistoryDAO.get_records_summary(db_session, self.uuid)
-                
-                try:
-                    summaries = sorted(summaries, key=lambda s: s.get('position', 0))
-                except Exception:
-                    pass
-                
-                current_record_id = getattr(self, '_current_record_id', None)
-                for summary in summaries:
-                    # Normalize fields
-                    summary['pos'] = summary.get('position', 0)
-                    summary['timestamp'] = summary.get('created_at', datetime.now().isoformat())
-                    summary['is_current'] = summary.get('id') == current_record_id
-                
-                return summaries
+                # Sorted by position with pos/timestamp/is_current already filled in;
+                # the current record is resolved from user_sessions by the query
+                return HistoryDAO.get_records_summary(db_session, self.uuid)
         except Exception as e:
-            logger.error(f"Error getting records summary for session {self.uuid}: {e}")
+            logger.error("Error getting records summary for session %s: %s", self.uuid, e)
             return [] 
     
     def update_record_outline(self, pos: int, outline: str) -> bool:
         """Update outline of specified record"""
         record = self.get_record_safe(pos)
         if record and record.db_record_id:
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                success = HistoryDAO.update_record_outline(
-                    db_session, record.db_record_id, outline
-                )
-                if success:
-                    record.outline = outline
-                    return True
+            success = self._with_session(
+                lambda db_session: HistoryDAO.update_record_outline(db_session, record.db_record_id, outline)
+            )
+            if success:
+                record.outline = outline
+                return True
         return False
 
     def update_record_topic(self, pos: int, topic: str) -> bool:
         """Update topic of specified record"""
         record = self.get_record_safe(pos)
         if record and record.db_record_id:
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                success = HistoryDAO.update_record_topic(
-                    db_session, record.db_record_id, topic
-                )
-                if success:
-                    record.topic = topic
-                    return True
+            success = self._with_session(
+                lambda db_session: HistoryDAO.update_record_topic(db_session, record.db_record_id, topic)
+            )
+            if success:
+                record.topic = topic
+                return True
         return False
     
     def update_record_article(self, pos: int, article: str) -> bool:
         """Update article of specified record (append to list)"""
         record = self.get_record_safe(pos)
         if record and record.db_record_id:
-            # Get current article list and append
-            current_articles = record.article or []
-            current_articles.append(article)
-            
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                success = HistoryDAO.update_record_articles(
-                    db_session, record.db_record_id, current_articles
+            # Append in the database, then mirror it in the local list only after success
+            success = self._with_session(
+                lambda db_session: HistoryDAO.update_record_articles(
+                    db_session, record.db_record_id, [article], append=True
                 )
-                if success:
-                    record.article = current_articles
-                    return True
+            )
+            if success:
+                # Mirror the append only into an already loaded list; an unloaded one
+                # is read from the database (with the new chapter) on first access
+                if record._article is not None:
+                    record._article.append(article)
+                return True
         return False
     
     def update_record_articles(self, pos: int, articles: List[str]) -> bool:
         """Update article list of specified record (replace entire list)"""
         record = self.get_record_safe(pos)
         if record and record.db_record_id:
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                success = HistoryDAO.update_record_articles(
-                    db_session, record.db_record_id, articles
-                )
-                if success:
-                    record.article = articles
-                    return True
+            success = self._with_session(
+                lambda db_session: HistoryDAO.update_record_articles(db_session, record.db_record_id, articles)
+            )
+            if success:
+                record.article = articles
+                return True
         return False
     
-    def update_record_references(self, pos: int, references: Dict) -> bool:
-        """Update reference data of specified record"""
+    def update_record_references(self, pos: int, references: Dict, format_hint: Optional[str] = None) -> bool:
+        """Update reference data of specified record
+        
+        format_hint is accepted for interface parity with the in-memory manager;
+        references are stored as-is here.
+        """
         record = self.get_record_safe(pos)
         if record and record.db_record_id:
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                success = HistoryDAO.update_record_references(
-                    db_session, record.db_record_id, references
-                )
-                if success:
-                    record.references = references
-                    return True
+            success = self._with_session(
+                lambda db_session: HistoryDAO.update_record_references(db_session, record.db_record_id, references)
+            )
+            if success:
+                record.references = references
+                return True
         return False
     
     def add_message(self, pos: int, role: str, content: str) -> bool:
         """Add message to specified record"""
         record = self.get_record_safe(pos)
         if record and record.db_record_id:
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                message = HistoryDAO.add_message(
-                    db_session, record.db_record_id, role, content
-                )
-                if message:
-                    # Add to memory cache
-                    if record._messages is None:
-                        record._messages = []
-                    record._messages.append({
-                        'role': role,
-                        'content': content,
-                        'timestamp': message.timestamp.isoformat(),
-                        'message_id': message.message_id,
-                    })
-                    return True
+            def _add(db_session: Session) -> Optional[Dict[str, Any]]:
+                message = HistoryDAO.add_message(db_session, record.db_record_id, role, content)
+                return _message_to_dict(message) if message else None
+            
+            message = self._with_session(_add)
+            if message:
+                # Add to memory cache
+                if record._messages is None:
+                    record._messages = []
+                record._messages.append(message)
+                return True
         return False
     
     def get_record_articles(self, pos: int) -> List[str]:
@@ -584,22 +677,20 @@ class UserSession:
         """Update reference data for specific chapter of specified record"""
         record = self.get_record_safe(pos)
         if record and record.db_record_id:
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                # Get current reference data
-                current_references = record.references or {}
-                
-                # Ensure chapter_index is in string format
-                chapter_key = str(chapter_index)
-                current_references[chapter_key] = chapter_references
-                
-                # Update database
-                success = HistoryDAO.update_record_references(
-                    db_session, record.db_record_id, current_references
+            # Ensure chapter_index is in string format
+            chapter_key = str(chapter_index)
+            
+            # Update only this chapter's entry in the database
+            success = self._with_session(
+                lambda db_session: HistoryDAO.update_record_chapter_references(
+                    db_session, record.db_record_id, chapter_key, chapter_references
                 )
-                if success:
-                    record.references = current_references
-                    return True
+            )
+            if success:
+                if record.references is None:
+                    record.references = {}
+                record.references[chapter_key] = chapter_references
+                return True
         return False
 
 
@@ -609,10 +700,56 @@ class UUIDManager:
     Refactored to use PostgreSQL storage, maintaining compatibility with original interface.
     """
     
-    def __init__(self):
-        self._user_sessions_cache = {}
+    def __init__(self, max_sessions: int = SESSION_CACHE_SIZE, session_ttl: float = SESSION_CACHE_TTL):
+        # uuid -> UserSession, least recently used first; bounded by max_sessions,
+        # idle entries expire after session_ttl
+        self._user_sessions_cache: 'OrderedDict[str, UserSession]' = OrderedDict()
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
         self.session_id = ""
     
+    def _get_cached_session(self, uuid: str) -> Optional[UserSession]:
+        """Get a cached session, dropping it if it has been idle longer than session_ttl"""
+        user_session = self._user_sessions_cache.get(uuid)
+        if user_session is None:
+            return None
+        
+        now = time.monotonic()
+        if now - user_session.last_accessed > self.session_ttl:
+            self.invalidate(uuid)
+            return None
+        user_session.last_accessed = now
+        self._user_sessions_cache.move_to_end(uuid)
+        return user_session
+    
+    def _cache_session(self, user_session: UserSession):
+        """Cache a freshly loaded session and drop entries made stale by its history migration"""
+        for old_uuid in user_session.migrated_session_uuids:
+            self.invalidate(old_uuid)
+        
+        self._user_sessions_cache[user_session.uuid] = user_session
+        self._user_sessions_cache.move_to_end(user_session.uuid)
+        if len(self._user_sessions_cache) > self.max_sessions:
+            self._evict_sessions(self.max_sessions)
+    
+    def _evict_sessions(self, max_sessions: int):
+        """Drop expired sessions, then the least recently used ones beyond max_sessions"""
+        now = time.monotonic()
+        expired = [
+            uuid for uuid, user_session in self._user_sessions_cache.items()
+            if now - user_session.last_accessed > self.session_ttl
+        ]
+        for uuid in expired:
+            del self._user_sessions_cache[uuid]
+        
+        # Every hit moves its entry to the end, so the front is the least recently used
+        while len(self._user_sessions_cache) > max_sessions:
+            self._user_sessions_cache.popitem(last=False)
+    
+    def invalidate(self, uuid: str):
+        """Drop a cached session so that the next access reloads it from the database"""
+        self._user_sessions_cache.pop(uuid, None)
+    
     def check_uuid(self) -> UserSession:
         """Check if UUID has user session, create new one if not exists"""
         # 1) Logged in user: Use email as stable session ID to avoid history becoming invisible due to restart/SECRET_KEY changes
@@ -628,39 +765,40 @@ class UUIDManager:
         # 2) Prefer using session_id already set in Flask session (may come from login or existing session)
         if 'session_id' in session:
             self.session_id = session['session_id']
-            logger.info(f"Using session_id: {self.session_id}")
+            logger.info("Using session_id: %s", self.session_id)
         else:
             # 3) If not, generate anonymous session UUID
             new_uuid = str(uuid_lib.uuid4())
             session['session_id'] = new_uuid
             self.session_id = new_uuid
-            logger.info(f"Generated anonymous session_id: {self.session_id}")
+            logger.info("Generated anonymous session_id: %s", self.session_id)
         
         # Check cache
-        if self.session_id in self._user_sessions_cache:
-            user_session = self._user_sessions_cache[self.session_id]
-            logger.info(f"User session found in cache for uuid: {self.session_id}")
+        user_session = self._get_cached_session(self.session_id)
+        if user_session is not None:
+            logger.info("User session found in cache for uuid: %s", self.session_id)
             return user_session
         
         # Create or load session
         user_session = UserSession(self.session_id)
-        self._user_sessions_cache[self.session_id] = user_session
+        self._cache_session(user_session)
         
-        logger.info(f"User session loaded/created for uuid: {self.session_id}")
+        logger.info("User session loaded/created for uuid: %s", self.session_id)
         return user_session
     
     def get_session_by_uuid(self, uuid: str) -> Optional[UserSession]:
         """Get user session by UUID"""
-        if uuid in self._user_sessions_cache:
-            return self._user_sessions_cache[uuid]
+        user_session = self._get_cached_session(uuid)
+        if user_session is not None:
+            return user_session
         
         # Try to load from database
         try:
             user_session = UserSession(uuid)
-            self._user_sessions_cache[uuid] = user_session
+            self._cache_session(user_session)
             return user_session
         except Exception as e:
-            logger.error(f"Failed to load session {uuid}: {e}")
+            logger.error("Failed to load session %s: %s", uuid, e)
             return None
     
     def get_current_session(self) -> Optional[UserSession]:
@@ -691,35 +829,29 @@ class UUIDManager:
         current_session = self.get_current_session()
         return current_session.set_current_pos(pos) if current_session else False
     
+    def _upsert_current_record(self, field: str, value: str) -> bool:
+        """Write field ('outline' or 'article') to the current record, creating one if the session has none"""
+        current_session = self.get_current_session()
+        if not current_session:
+            return False
+        
+        # Creating the record and writing the field commit together
+        with current_session.transaction():
+            current_pos, _ = current_session.get_current_pos_and_record()
+            if current_pos < 0:
+                current_session.create_record()
+                current_pos = len(current_session.history_records) - 1
+            
+            update = getattr(current_session, f"update_record_{field}")
+            return update(current_pos, value)
+    
     def save_outline_to_current_pos(self, outline: str) -> bool:
         """Save outline to current position of current session"""
-        current_session = self.get_current_session()
-        if current_session:
-            current_pos = current_session.get_current_pos()
-            if current_pos >= 0:
-                return current_session.update_record_outline(current_pos, outline)
-            else:
-                # Create new record
-                record = current_session.create_record()
-                return current_session.update_record_outline(
-                    len(current_session.history_records) - 1, outline
-                )
-        return False
+        return self._upsert_current_record("outline", outline)
     
     def save_article_to_current_pos(self, article: str) -> bool:
         """Save article to current position of current session"""
-        current_session = self.get_current_session()
-        if current_session:
-            current_pos = current_session.get_current_pos()
-            if current_pos >= 0:
-                return current_session.update_record_article(current_pos, article)
-            else:
-                # Create new record
-                record = current_session.create_record()
-                return current_session.update_record_article(
-                    len(current_session.history_records) - 1, article
-                )
-        return False
+        return self._upsert_current_record("article", article)
 
     def save_topic_to_current_pos(self, topic: str) -> bool:
         """Save topic to current record (save to both topic field and __topic field in references_data)"""
@@ -728,31 +860,29 @@ class UUIDManager:
             if not current_session:
                 return False
             # Ensure there is a current record
-            current_record = current_session.get_current_record()
+            _, current_record = current_session.get_current_pos_and_record()
             if not current_record:
                 current_record = current_session.create_record()
 
             if not current_record or not current_record.db_record_id:
                 return False
 
-            # 1. Update record's topic field
-            current_pos = current_session.get_current_pos()
-            topic_success = current_session.update_record_topic(current_pos, topic)
-            
-            # 2. Merge and update topic field in reference data (maintain backward compatibility)
+            # Merge topic field into reference data (maintain backward compatibility)
             merged_refs = current_record.references or {}
             if not isinstance(merged_refs, dict):
                 merged_refs = {}
-            merged_refs['__topic'] = topic
+            merged_refs = {**merged_refs, '__topic': topic}
 
-            db_manager = get_db_manager()
-            with db_manager.get_session() as db_session:
-                refs_success = HistoryDAO.update_record_references(db_session, current_record.db_record_id, merged_refs)
-                if refs_success:
-                    current_record.references = merged_refs
-                
-                # Return True as long as topic field update succeeds
-                return topic_success
+            # Update record's topic field and references in a single statement
+            success = current_session._with_session(
+                lambda db_session: HistoryDAO.update_record_topic_and_refs(
+                    db_session, current_record.db_record_id, topic, merged_refs
+                )
+            )
+            if success:
+                current_record.topic = topic
+                current_record.references = merged_refs
+            return success
         except Exception:
             return False
     
@@ -762,14 +892,11 @@ class UUIDManager:
         with db_manager.get_session() as db_session:
             deleted_count = SessionDAO.cleanup_old_sessions(db_session, max_sessions)
             
-        # Clean up memory cache
+        # Clean up memory cache (LRU eviction)
         if len(self._user_sessions_cache) > max_sessions:
-            # Simple LRU cleanup
-            cache_items = list(self._user_sessions_cache.items())
-            keep_items = cache_items[-max_sessions:]
-            self._user_sessions_cache = dict(keep_items)
+            self._evict_sessions(max_sessions)
             
-        logger.info(f"Cleaned up sessions: {deleted_count} from database, cache size: {len(self._user_sessions_cache)}")
+        logger.info("Cleaned up sessions: %s from database, cache size: %s", deleted_count, len(self._user_sessions_cache))
 
     def logout_current_user(self):
         """Logout current user, clean up session cache and Flask session"""
@@ -777,20 +904,16 @@ class UUIDManager:
             current_session_id = self.session_id
             if current_session_id:
                 # Remove current session from memory cache
-                if current_session_id in self._user_sessions_cache:
-                    del self._user_sessions_cache[current_session_id]
-                    logger.info(f"Removed session {current_session_id} from cache")
+                self._user_sessions_cache.pop(current_session_id, None)
                 
                 # Clear session_id from Flask session
-                if 'session_id' in session:
-                    session.pop('session_id')
-                    logger.info(f"Cleared session_id from Flask session")
+                session.pop('session_id', None)
                 
                 # Reset current session ID
                 self.session_id = ""
                 
-                logger.info(f"Successfully logged out user from session {current_session_id}")
+                logger.info("Successfully logged out user from session %s", current_session_id)
             else:
                 logger.info("No active session to logout")
         except Exception as e:
-            logger.error(f"Error during logout: {e}")
+            logger.error("Error during logout: %s", e)
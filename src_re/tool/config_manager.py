@@ -2,19 +2,55 @@
 Load YAML Config File
 """
 
+import copy
+import functools
 import os
 import yaml
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field, fields
 from typing import Dict, Any, Optional
 from pathlib import Path
 import logging
 
+# libyaml C bindings when PyYAML was built with them
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@functools.lru_cache(maxsize=8)
+def _load_yaml_cached(config_path: str, mtime: float) -> Any:
+    """Parse a YAML config file; mtime is part of the cache key so edits are picked up"""
+    with open(config_path, 'r', encoding='utf-8') as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+# (environment variable, config section, attribute, caster); a set variable always wins
+_ENV_OVERRIDES = (
+    ('DB_PASSWORD', 'database', 'password', str),
+    ('DB_HOST', 'database', 'host', str),
+    ('DB_PORT', 'database', 'port', int),
+    ('DB_NAME', 'database', 'database', str),
+    ('DB_USER', 'database', 'username', str),
+    ('DB_POOL_USE_LIFO', 'database', 'pool_use_lifo', _parse_bool),
+)
+
+# Environment variables that only fill in a value the config file left empty
+_ENV_FALLBACKS = (
+    ('ARK_API_KEY', 'model', 'api_key'),
+    ('SEARCH_API_KEY', 'search', 'api_key'),
+)
+
+
+@dataclass(slots=True)
 class FlaskConfig:
     """Flask application configuration"""
     static_folder: str = "front_end_re"
@@ -22,7 +58,7 @@ class FlaskConfig:
     template_folder: str = "front_end_re"
 
 
-@dataclass
+@dataclass(slots=True)
 class AppConfig:
     """Application basic configuration"""
     name: str = "OmniThink"
@@ -36,7 +72,7 @@ class AppConfig:
     SESSION_COOKIE_SECURE: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class ModelConfig:
     """Language model configuration"""
     type: str = "VolcEngine"
@@ -49,7 +85,7 @@ class ModelConfig:
     outlineType: str = "default"  
 
 
-@dataclass
+@dataclass(slots=True)
 class SearchConfig:
     """Search configuration"""
     api_key: str = ""
@@ -73,7 +109,7 @@ class SearchConfig:
     retry_delay: int = 2
 
 
-@dataclass
+@dataclass(slots=True)
 class LoggingConfig:
     """Logging configuration"""
     level: str = "INFO"
@@ -81,7 +117,7 @@ class LoggingConfig:
     format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
 
-@dataclass
+@dataclass(slots=True)
 class DatabaseConfig:
     """Database configuration"""
     host: str = "localhost"
@@ -93,10 +129,12 @@ class DatabaseConfig:
     max_overflow: int = 20
     pool_timeout: int = 30
     pool_recycle: int = 3600
+    pool_use_lifo: bool = True  # Reuse the most recently returned connection first
+    pool_pre_ping: bool = True  # Validate connection liveness on checkout
     echo: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Config:
     """Main configuration class"""
     flask: FlaskConfig = field(default_factory=FlaskConfig)
@@ -107,69 +145,51 @@ class Config:
     database: DatabaseConfig = field(default_factory=DatabaseConfig)
     
     def __post_init__(self):
-        # 保证所有字段都不是None
-        if self.flask is None:
-            self.flask = FlaskConfig()
-        if self.app is None:
-            self.app = AppConfig()
-        if self.model is None:
-            self.model = ModelConfig()
-        if self.search is None:
-            self.search = SearchConfig()
-        if self.logging is None:
-            self.logging = LoggingConfig()
-        if self.database is None:
-            self.database = DatabaseConfig()
+        # A section passed as None (e.g. an explicit null) falls back to its defaults
+        for config_field in fields(self):
+            if getattr(self, config_field.name) is None:
+                setattr(self, config_field.name, config_field.default_factory())
         self._load_environment_variables()
     
     def _load_environment_variables(self):
         """Load sensitive configuration from environment variables"""
-        if self.model and not self.model.api_key:
-            self.model.api_key = os.getenv('ARK_API_KEY', '')
-        if self.search and not self.search.api_key:
-            self.search.api_key = os.getenv('SEARCH_API_KEY', '')
-        if self.app and (not self.app.secret_key or self.app.secret_key == "your-secret-key-here"):
-            self.app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-here')
+        env = os.environ
+        for env_key, section, attr in _ENV_FALLBACKS:
+            config_section = getattr(self, section)
+            if not getattr(config_section, attr):
+                setattr(config_section, attr, env.get(env_key, ''))
+        if not self.app.secret_key or self.app.secret_key == "your-secret-key-here":
+            self.app.secret_key = env.get('SECRET_KEY', 'your-secret-key-here')
         
-        if self.database:
-            if os.getenv('DB_PASSWORD'):
-                self.database.password = os.getenv('DB_PASSWORD')
-            elif not self.database.password:
-                self.database.password = os.getenv('DB_PASSWORD', '')
-            
-            if os.getenv('DB_HOST'):
-                self.database.host = os.getenv('DB_HOST')
-            if os.getenv('DB_PORT'):
+        for env_key, section, attr, caster in _ENV_OVERRIDES:
+            value = env.get(env_key)
+            if value:
                 try:
-                    self.database.port = int(os.getenv('DB_PORT'))
+                    setattr(getattr(self, section), attr, caster(value))
                 except ValueError:
                     pass
-            if os.getenv('DB_NAME'):
-                self.database.database = os.getenv('DB_NAME')
-            if os.getenv('DB_USER'):
-                self.database.username = os.getenv('DB_USER')
-            
-            database_url = os.getenv('DATABASE_URL')
-            if database_url:
-                try:
-                    from urllib.parse import urlparse
-                    parsed = urlparse(database_url)
-                    self.database.host = parsed.hostname or self.database.host
-                    self.database.port = parsed.port or self.database.port
-                    self.database.database = parsed.path.lstrip('/') or self.database.database
-                    self.database.username = parsed.username or self.database.username
-                    self.database.password = parsed.password or self.database.password
-                except Exception as e:
-                    logger.warning(f"Failed to parse DATABASE_URL: {e}")
-            
-            logger.info(f"Database config loaded: {self.database.host}:{self.database.port}/{self.database.database} (user: {self.database.username})")
+        
+        database_url = env.get('DATABASE_URL')
+        if database_url:
+            try:
+                from urllib.parse import urlparse
+                parsed = urlparse(database_url)
+                self.database.host = parsed.hostname or self.database.host
+                self.database.port = parsed.port or self.database.port
+                self.database.database = parsed.path.lstrip('/') or self.database.database
+                self.database.username = parsed.username or self.database.username
+                self.database.password = parsed.password or self.database.password
+            except Exception as e:
+                logger.warning("Failed to parse DATABASE_URL: %s", e)
+        
+        logger.info("Database config loaded: %s:%s/%s (user: %s)", self.database.host, self.database.port, self.database.database, self.database.username)
     
     @classmethod
     def from_yaml(cls, config_path: str) -> 'Config':
         if Path(config_path).exists():
             try:
-                with open(config_path, 'r', encoding='utf-8') as file:
-                    data = yaml.safe_load(file)
+                # Each Config gets its own copy, the parsed data is shared through the cache
+                data = copy.deepcopy(_load_yaml_cached(config_path, os.path.getmtime(config_path)))
                 flask_config = FlaskConfig(**data.get('flask', {})) if data.get('flask') is not None else FlaskConfig()
                 app_config = AppConfig(**data.get('app', {})) if data.get('app') is not None else AppConfig()
                 model_config = ModelConfig(**data.get('model', {})) if data.get('model') is not None else ModelConfig()
@@ -184,14 +204,14 @@ class Config:
                     logging=logging_config,
                     database=database_config
                 )
-                logger.info(f"Successfully loaded configuration from {config_path}")
+                logger.info("Successfully loaded configuration from %s", config_path)
                 return config
             except Exception as e:
-                logger.error(f"Failed to load configuration file {config_path}: {e}")
+                logger.error("Failed to load configuration file %s: %s", config_path, e)
                 logger.info("Using default configuration")
                 return cls()
         else:
-            logger.warning(f"Configuration file {config_path} does not exist, using default configuration")
+            logger.warning("Configuration file %s does not exist, using default configuration", config_path)
             return cls()
     
     def validate(self) -> bool:
@@ -227,131 +247,46 @@ class Config:
         if errors:
             logger.error("Configuration validation failed:")
             for error in errors:
-                logger.error(f"  - {error}")
+                logger.error("  - %s", error)
             return False
         
         logger.info("Configuration validation passed")
         return True
     
+    def _to_yaml_dict(self) -> Dict[str, Any]:
+        """Config as plain dicts for YAML, with secrets replaced by environment placeholders"""
+        config_dict = asdict(self)
+        # Database credentials come from the environment only
+        config_dict.pop('database')
+        config_dict['app']['secret_key'] = '${SECRET_KEY}'
+        config_dict['model']['api_key'] = '${ARK_API_KEY}'
+        config_dict['search']['api_key'] = '${SEARCH_API_KEY}'
+        return config_dict
+    
     def save(self, config_path: str):
         """Save configuration to YAML file"""
         try:
-            config_dict = {}
-            
-            if self.flask:
-                config_dict['flask'] = {
-                    'static_folder': self.flask.static_folder,
-                    'static_url_path': self.flask.static_url_path,
-                    'template_folder': self.flask.template_folder
-                }
-            
-            if self.app:
-                config_dict['app'] = {
-                    'name': self.app.name,
-                    'debug': self.app.debug,
-                    'host': self.app.host,
-                    'port': self.app.port,
-                    'secret_key': '${SECRET_KEY}'
-                }
-            
-            if self.model:
-                config_dict['model'] = {
-                    'name': self.model.name,
-                    'api_key': '${ARK_API_KEY}',
-                    'base_url': self.model.base_url,
-                    'max_tokens': self.model.max_tokens,
-                    'temperature': self.model.temperature,
-                    'top_p': self.model.top_p
-                }
-            
-            if self.search:
-                config_dict['search'] = {
-                    'api_key': '${SEARCH_API_KEY}',
-                    'top_k': self.search.top_k,
-                    'search_engine': self.search.search_engine,
-                    'debug': self.search.debug,
-                    'scene': self.search.scene,
-                    'page': self.search.page,
-                    'custom_config_info': self.search.custom_config_info,
-                    'api_endpoint': self.search.api_endpoint,
-                    'max_retries': self.search.max_retries,
-                    'retry_delay': self.search.retry_delay
-                }
-            
-            if self.logging:
-                config_dict['logging'] = {
-                    'level': self.logging.level,
-                    'file': self.logging.file,
-                    'format': self.logging.format
-                }
-            
             with open(config_path, 'w', encoding='utf-8') as file:
-                yaml.dump(config_dict, file, default_flow_style=False, allow_unicode=True)
+                yaml.dump(self._to_yaml_dict(), file, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True)
             
-            logger.info(f"Configuration saved to {config_path}")
+            logger.info("Configuration saved to %s", config_path)
             
         except Exception as e:
-            logger.error(f"Failed to save configuration file: {e}")
+            logger.error("Failed to save configuration file: %s", e)
     
     def create_template(self, template_path: str):
         """Create configuration template file"""
         try:
-            template_config = {
-                'flask': {
-                    'static_folder': 'front_end_re',
-                    'static_url_path': '/static',
-                    'template_folder': 'front_end_re'
-                },
-                'app': {
-                    'name': 'OmniThink',
-                    'debug': False,
-                    'host': '0.0.0.0',
-                    'port': 5000,
-                    'secret_key': '${SECRET_KEY}'
-                },
-                'model': {
-                    'name': 'deepseek-v3-250324',
-                    'api_key': '${ARK_API_KEY}',
-                    'base_url': 'https://ark.cn-beijing.volces.com/api/v3',
-                    'max_tokens': 4096,
-                    'temperature': 0.7,
-                    'top_p': 0.7
-                },
-                'search': {
-                    'api_key': '${SEARCH_API_KEY}',
-                    'top_k': 5,
-                    'search_engine': 'bing',
-                    'debug': True,
-                    'scene': 'dolphin_search_google_nlp',
-                    'page': 1,
-                    'custom_config_info': {
-                        "multiSearch": False,
-                        "qpMultiQuery": False,
-                        "qpMultiQueryHistory": [],
-                        "qpSpellcheck": False,
-                        "qpEmbedding": False,
-                        "knnWithScript": False,
-                        "qpTermsWeight": False,
-                        "pluginServiceConfig": {"qp": "mvp_search_qp_qwen"},
-                    },
-                    'api_endpoint': 'http://101.37.167.147/gw/v1/api/msearch-sp/qwen-search',
-                    'max_retries': 5,
-                    'retry_delay': 2
-                },
-                'logging': {
-                    'level': 'INFO',
-                    'file': 'app.log',
-                    'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-                }
-            }
+            # A fresh Config carries the built-in defaults
+            template_config = type(self)()._to_yaml_dict()
             
             with open(template_path, 'w', encoding='utf-8') as file:
-                yaml.dump(template_config, file, default_flow_style=False, allow_unicode=True)
+                yaml.dump(template_config, file, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True)
             
-            logger.info(f"Configuration template created: {template_path}")
+            logger.info("Configuration template created: %s", template_path)
             
         except Exception as e:
-            logger.error(f"Failed to create configuration template: {e}")
+            logger.error("Failed to create configuration template: %s", e)
 
 
 class ConfigManager:
@@ -400,6 +335,7 @@ class ConfigManager:
     
     def reload(self):
         """Reload configuration"""
+        _load_yaml_cached.cache_clear()
         self.config = Config.from_yaml(self.config_file)
 
 
@@ -9,11 +9,89 @@ comprehensive logging for debugging and monitoring.
 
 import os
 import time
-import random
-from openai import OpenAI
+import asyncio
+import functools
+import weakref
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APITimeoutError
 import requests
 import logging
 from .config_manager import ConfigManager, Config
+from .retry import backoff_delay, RETRY_MAX_DELAY
+
+logger = logging.getLogger(__name__)
+
+# Substrings used to categorize the final API error message
+TIMEOUT_ERROR_KEYWORDS = frozenset({"timeout", "timed out", "time out"})
+CONNECTION_ERROR_KEYWORDS = frozenset({"connection", "connect", "network", "unreachable"})
+
+# Exponential backoff between API retries (seconds), capped at RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 0.5
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """
+    Compute how long to wait before retrying after a failed attempt.
+    
+    Uses exponential backoff with jitter, extended to a Retry-After header
+    when the error carries an HTTP response (e.g. openai.RateLimitError).
+    The wait is capped at RETRY_MAX_DELAY.
+    """
+    return backoff_delay(RETRY_BASE_DELAY * (2 ** attempt), error, RETRY_MAX_DELAY)
+
+
+@functools.lru_cache(maxsize=16)
+def _get_openai_client(base_url: str, api_key: str, timeout: float) -> OpenAI:
+    """
+    Get a shared OpenAI client for the given endpoint and credentials.
+    
+    OpenAI clients are thread-safe and each owns an HTTP connection pool,
+    so LLMModel instances with the same settings reuse one client and its
+    keep-alive connections instead of paying a new TLS handshake each.
+    """
+    return OpenAI(base_url=base_url, api_key=api_key, timeout=timeout)
+
+
+# Async clients per event loop: their HTTP connection pools cannot be shared across loops
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+
+
+def _get_async_openai_client(base_url: str, api_key: str, timeout: float) -> AsyncOpenAI:
+    """
+    Get a shared AsyncOpenAI client for the running event loop.
+    
+    Must be called from a coroutine; clients are reused for the lifetime
+    of the loop, mirroring _get_openai_client for the sync path.
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    key = (base_url, api_key, timeout)
+    client = clients.get(key)
+    if client is None:
+        client = clients[key] = AsyncOpenAI(base_url=base_url, api_key=api_key, timeout=timeout)
+    return client
+
+
+def _final_error(max_retries: int, last_error: Exception) -> RuntimeError:
+    """
+    Build the error raised once all retry attempts have failed.
+    
+    Categorizes the last error so calling code can tell network timeouts
+    and connection problems apart from other failures.
+    """
+    error_msg = f"LM API调用失败，重试{max_retries}次后仍然失败"
+    if last_error:
+        error_msg += f": {str(last_error)}"
+    logger.error(error_msg)
+    
+    if last_error:
+        # Categorize errors for better error handling by calling code;
+        # openai's exception types answer directly, the message scan covers the rest
+        error_str = str(last_error).lower()
+        if isinstance(last_error, APITimeoutError) or any(keyword in error_str for keyword in TIMEOUT_ERROR_KEYWORDS):
+            return RuntimeError(f"Network timeout error: {error_msg}")
+        elif isinstance(last_error, APIConnectionError) or any(keyword in error_str for keyword in CONNECTION_ERROR_KEYWORDS):
+            return RuntimeError(f"Network connection error: {error_msg}")
+    return RuntimeError(error_msg)
+
 
 class LLMModel:
     """
@@ -39,11 +117,16 @@ class LLMModel:
         self.temperature = config.model.temperature
         self.top_p = config.model.top_p
 
-        # Initialize OpenAI client with configuration
-        self.client = OpenAI(base_url = self.base_url, 
-                             api_key  = self.api_key,
-                             timeout=60.0  
-                            )
+        # Shared OpenAI client (and connection pool) for this configuration
+        self.client = _get_openai_client(self.base_url, self.api_key, 60.0)
+
+        # Backend methods resolved once, so call/call_async dispatch without comparing the type
+        backends = {
+            "VolcEngine": (self.volcengine_call, self.volcengine_call_async),
+        }
+        if self.type not in backends:
+            raise ValueError(f"Unsupported model type: {self.type}")
+        self._backend, self._async_backend = backends[self.type]
 
     def call(self, messages: list, **kwargs):
         """
@@ -56,8 +139,7 @@ class LLMModel:
         Returns:
             Model response content
         """
-        if self.type == "VolcEngine":
-            return self.volcengine_call(messages, **kwargs)
+        return self._backend(messages, **kwargs)
 
     def generate(self, prompt: str, **kwargs):
         """
@@ -95,18 +177,153 @@ class LLMModel:
             RuntimeError: When all retry attempts fail with specific error categorization
         """
         max_retries = kwargs.get("max_retries", 3)
-        logging.info(f"Calling {self.name} Model ...")
+        logger.info("Calling %s Model ...", self.name)
         
         last_error = None
         for attempt in range(max_retries):
+            start_time = time.perf_counter()
             try:
-                logging.info(f"Attempt {attempt + 1} to calling {self.name} Model ...")
+                logger.info("Attempt %s to calling %s Model ...", attempt + 1, self.name)
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Starting API call at %s", time.strftime('%H:%M:%S'))
+                
+                # Execute API call with configured parameters; the response is streamed
+                # and joined here so a failure mid-stream is retried like any other
+                content = "".join(self._stream_completion(messages))
                 
-                start_time = time.time()
-                logging.info(f"Starting API call at {time.strftime('%H:%M:%S', time.localtime(start_time))}")
+                duration = time.perf_counter() - start_time
+                logger.info("API call completed in %.2f seconds", duration)
+                
+                return content
+                
+            except Exception as e:
+                last_error = e
+                duration = time.perf_counter() - start_time
+                
+                logger.error("The %s-th request to LM API failed after %.2f seconds with the following error:\n%s", attempt + 1, duration, e)
+                logger.error("Error type: %s", type(e).__name__)
+                
+                # Implement exponential backoff for retries
+                if attempt < max_retries - 1:  
+                    delay = _retry_delay(attempt, e)
+                    logger.info("Waiting %.2f seconds before retry...", delay)
+                    time.sleep(delay)
+                else:
+                    logger.error("All %s attempts failed", max_retries)
+        
+        # Provide detailed error categorization for better debugging
+        raise _final_error(max_retries, last_error)
+
+    def _stream_completion(self, messages: list):
+        """
+        Issue one streaming completion request and yield its content pieces.
+        
+        Args:
+            messages: List of message dictionaries
+            
+        Yields:
+            Non-empty content fragments in generation order
+        """
+        completion = self.client.chat.completions.create(
+            model=self.name,
+            messages=messages,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            top_p=self.top_p,
+            stream=True,
+            timeout=30.0  
+        )
+        for chunk in completion:
+            if chunk.choices:
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield content
+
+    def volcengine_call_stream(self, messages: list, **kwargs):
+        """
+        Stream the VolcEngine model response as it is generated.
+        
+        Failed attempts are retried with the same backoff as volcengine_call
+        as long as nothing has been yielded yet; an error after the first
+        fragment is re-raised, since the caller already consumed part of
+        the output.
+        
+        Args:
+            messages: List of message dictionaries
+            **kwargs: Additional parameters including max_retries
+            
+        Yields:
+            Content fragments of the model response
+            
+        Raises:
+            RuntimeError: When all retry attempts fail with specific error categorization
+        """
+        max_retries = kwargs.get("max_retries", 3)
+        logger.info("Calling %s Model (stream) ...", self.name)
+        
+        last_error = None
+        for attempt in range(max_retries):
+            yielded = False
+            try:
+                for content in self._stream_completion(messages):
+                    yielded = True
+                    yield content
+                return
+            except Exception as e:
+                if yielded:
+                    raise
+                last_error = e
+                logger.error("The %s-th request to LM API failed with the following error:\n%s", attempt + 1, e)
                 
-                # Execute API call with configured parameters
-                completion = self.client.chat.completions.create(
+                if attempt < max_retries - 1:  
+                    delay = _retry_delay(attempt, e)
+                    logger.info("Waiting %.2f seconds before retry...", delay)
+                    time.sleep(delay)
+                else:
+                    logger.error("All %s attempts failed", max_retries)
+        
+        raise _final_error(max_retries, last_error)
+
+    async def call_async(self, messages: list, **kwargs):
+        """
+        Route API calls based on model type without blocking the event loop.
+        
+        Args:
+            messages: List of message dictionaries for the conversation
+            **kwargs: Additional parameters for the API call
+            
+        Returns:
+            Model response content
+        """
+        return await self._async_backend(messages, **kwargs)
+
+    async def volcengine_call_async(self, messages: list, **kwargs):
+        """
+        Execute API call to VolcEngine model with retry logic, asynchronously.
+        
+        Same retry and error handling as volcengine_call, but the request
+        and the backoff sleeps are awaited so other coroutines keep running.
+        
+        Args:
+            messages: List of message dictionaries
+            **kwargs: Additional parameters including max_retries
+            
+        Returns:
+            Model response content
+            
+        Raises:
+            RuntimeError: When all retry attempts fail with specific error categorization
+        """
+        max_retries = kwargs.get("max_retries", 3)
+        client = _get_async_openai_client(self.base_url, self.api_key, 60.0)
+        logger.info("Calling %s Model (async) ...", self.name)
+        
+        last_error = None
+        for attempt in range(max_retries):
+            start_time = time.perf_counter()
+            try:
+                completion = await client.chat.completions.create(
                     model=self.name,
                     messages=messages,
                     max_tokens=self.max_tokens,
@@ -116,42 +333,23 @@ class LLMModel:
                     timeout=30.0  
                 )
                 
-                end_time = time.time()
-                duration = end_time - start_time
-                logging.info(f"API call completed in {duration:.2f} seconds")
+                duration = time.perf_counter() - start_time
+                logger.info("API call completed in %.2f seconds", duration)
                 
                 return completion.choices[0].message.content
                 
             except Exception as e:
                 last_error = e
-                end_time = time.time()
-                duration = end_time - start_time if 'start_time' in locals() else 0
+                duration = time.perf_counter() - start_time
                 
-                logging.error(f"The {attempt + 1}-th request to LM API failed after {duration:.2f} seconds with the following error:\n{e}")
-                logging.error(f"Error type: {type(e).__name__}")
+                logger.error("The %s-th request to LM API failed after %.2f seconds with the following error:\n%s", attempt + 1, duration, e)
+                logger.error("Error type: %s", type(e).__name__)
                 
-                # Implement exponential backoff for retries
                 if attempt < max_retries - 1:  
-                    delay = random.uniform(1, 5)  
-                    logging.info(f"Waiting {delay:.2f} seconds before retry...")
-                    time.sleep(delay)
+                    delay = _retry_delay(attempt, e)
+                    logger.info("Waiting %.2f seconds before retry...", delay)
+                    await asyncio.sleep(delay)
                 else:
-                    logging.error(f"All {max_retries} attempts failed")
+                    logger.error("All %s attempts failed", max_retries)
         
-        # Provide detailed error categorization for better debugging
-        error_msg = f"LM API调用失败，重试{max_retries}次后仍然失败"
-        if last_error:
-            error_msg += f": {str(last_error)}"
-        logging.error(error_msg)
-        
-        if last_error:
-            error_str = str(last_error).lower()
-            # Categorize errors for better error handling by calling code
-            if any(keyword in error_str for keyword in ["timeout", "timed out", "time out"]):
-                raise RuntimeError(f"Network timeout error: {error_msg}")
-            elif any(keyword in error_str for keyword in ["connection", "connect", "network", "unreachable"]):
-                raise RuntimeError(f"Network connection error: {error_msg}")
-            else:
-                raise RuntimeError(error_msg)
-        else:
-            raise RuntimeError(error_msg)
+        raise _final_error(max_retries, last_error)
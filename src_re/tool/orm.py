@@ -1,10 +1,28 @@
-from typing import Union, List
-import json
-import requests
+from typing import Union, List, Optional
+import asyncio
+import httpx
 import logging
+import threading
 import time
 import uuid
+from collections import OrderedDict
 from .config_manager import Config
+from .retry import backoff_delay
+
+try:
+    import orjson
+except ImportError:  # Optional; falls back to the stdlib json in httpx
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on search requests in flight for one call
+SEARCH_MAX_CONCURRENCY = 32
+SEARCH_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# In-process cache of search results per normalized query
+SEARCH_CACHE_SIZE = 4096
+SEARCH_CACHE_TTL = 3600  # Seconds a cached result stays valid
 
 class AliGoogleSearch:
     def __init__(self, config: Config):
@@ -19,10 +37,9 @@ class AliGoogleSearch:
         self.api_endpoint = search_cfg.api_endpoint
         self.max_retries = search_cfg.max_retries
         self.retry_delay = search_cfg.retry_delay
+        # Request fields shared by every query; _request_body adds "uq" and a fresh "rid"
         self.template = {
-            "rid": str(uuid.uuid4()),
             "scene": self.scene,
-            "uq": "",
             "debug": self.debug,
             "fields": [],
             "page": self.page,
@@ -30,50 +47,180 @@ class AliGoogleSearch:
             "customConfigInfo": self.custom_config_info,
             "headers": {"__d_head_qto": 5000},
         }
+        self.headers = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": "utf-8",
+            "Authorization": f"Bearer {self.api_key}",
+        }
+        # Pooled keep-alive connections for single-query calls
+        self.client = httpx.Client(
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=SEARCH_MAX_CONCURRENCY, max_keepalive_connections=16),
+            timeout=SEARCH_TIMEOUT,
+        )
+        # Long-lived async client for concurrent queries; lives on the loop from _search_loop
+        self._aclient: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+        # normalized query -> (monotonic expiry time, (url, title, snippet) tuples), least recently used first
+        self._cache: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._cache_lock = threading.Lock()
 
     def __call__(self, query_or_queries: Union[str, List[str]], **kwargs) -> List[dict]:
+        """Search one or more queries; several queries are sent concurrently"""
+        if isinstance(query_or_queries, str):
+            query_or_queries = [query_or_queries]
+        self.usage += len(query_or_queries)
+        if len(query_or_queries) == 1:
+            # No event loop needed, and the pooled connection is reused across calls
+            return self._fetch(query_or_queries[0])
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            future = asyncio.run_coroutine_threadsafe(self._gather(query_or_queries), self._search_loop())
+            return future.result()
+        # Called from a coroutine: waiting on the search loop would block the caller's
+        # loop just the same, so stay on the pooled sync client
+        return [result for query in query_or_queries for result in self._fetch(query)]
+
+    async def acall(self, query_or_queries: Union[str, List[str]], **kwargs) -> List[dict]:
         queries = (
             [query_or_queries]
             if isinstance(query_or_queries, str)
             else query_or_queries
         )
         self.usage += len(queries)
+        if not queries:
+            return []
+        # Run on the search loop so every call shares the one AsyncClient and its connections
+        future = asyncio.run_coroutine_threadsafe(self._gather(queries), self._search_loop())
+        return await asyncio.wrap_future(future)
+
+    def _search_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop owning the async client, started on a daemon thread on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="search-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    async def _gather(self, queries: List[str]) -> List[dict]:
+        # Only ever runs on the search loop, so the client is created once without a lock
+        if self._aclient is None:
+            self._aclient = httpx.AsyncClient(
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=SEARCH_MAX_CONCURRENCY, max_keepalive_connections=16),
+                timeout=SEARCH_TIMEOUT,
+            )
+        sem = asyncio.Semaphore(min(len(queries), SEARCH_MAX_CONCURRENCY))
+        results_per_query = await asyncio.gather(
+            *[self._afetch(self._aclient, sem, query) for query in queries]
+        )
+
+        # Keep the results in query order
+        return [result for results in results_per_query for result in results]
+
+    def _cache_get(self, query: str) -> Optional[List[dict]]:
+        key = " ".join(query.split())
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+        # Entries are immutable; each hit gets its own dicts, so callers may modify them
+        return [
+            {'url': url, 'title': title, 'description': snippet, 'snippets': [snippet]}
+            for url, title, snippet in entry[1]
+        ]
+
+    def _cache_put(self, query: str, results: List[dict]):
+        # Failed searches come back empty and are not cached
+        if not results:
+            return
+        key = " ".join(query.split())
+        # Stored as tuples so nothing the caller keeps can alter the cached entry
+        entry = tuple((result['url'], result['title'], result['description']) for result in results)
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + SEARCH_CACHE_TTL, entry)
+            self._cache.move_to_end(key)
+            while len(self._cache) > SEARCH_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _retry_delay(self, attempt: int, error: Exception) -> float:
+        """Exponential backoff with jitter, at least the server's Retry-After, capped at RETRY_MAX_DELAY"""
+        return backoff_delay(self.retry_delay * (2 ** (attempt - 1)), error)
+
+    def _request_body(self, query: str) -> dict:
+        """httpx keyword arguments carrying the JSON request body for query"""
+        payload = {**self.template, "rid": str(uuid.uuid4()), "uq": query}
+        if orjson is not None:
+            return {"content": orjson.dumps(payload)}
+        return {"json": payload}
+
+    @staticmethod
+    def _parse_results(response: httpx.Response) -> List[dict]:
+        response.raise_for_status()
+        response_data = orjson.loads(response.content) if orjson is not None else response.json()
+        # Process search results
+        search_results = response_data['data']['docs']
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("search returned %d docs", len(search_results))
+        return [
+            {
+                'url': result['url'],
+                'title': result['title'],
+                'description': snippet,
+                'snippets': [snippet]
+            }
+            for result in search_results
+            for snippet in (result.get('snippet', ''),)
+        ]
+
+    def _fetch(self, query: str) -> List[dict]:
+        cached = self._cache_get(query)
+        if cached is not None:
+            return cached
+        body = self._request_body(query)
+        attempt = 0
+        while attempt < self.max_retries:
+            attempt += 1
+            try:
+                results = self._parse_results(self.client.post(self.api_endpoint, **body))
+                self._cache_put(query, results)
+                return results
+            except httpx.HTTPError as e:
+                logger.error('Attempt %s failed for query "%s": %s', attempt, query, e)
+                if attempt < self.max_retries:
+                    time.sleep(self._retry_delay(attempt, e))
+            except Exception as e:
+                logger.error('Unexpected error for query "%s": %s', query, e)
+                break  # Non-network error, exit retry loop
+        return []
 
-        collected_results = []
-        for query in queries:
-            attempt = 0
-            while attempt < self.max_retries:
-                attempt += 1
-                try:
-                    self.template["uq"] = query
-                    headers = {
-                        "Content-Type": "application/json",
-                        "Accept-Encoding": "utf-8",
-                        "Authorization": f"Bearer {self.api_key}",
-                    }
-                    response = requests.post(
-                        self.api_endpoint,
-                        data=json.dumps(self.template),
-                        headers=headers,
-                    )
-                    response.raise_for_status()
-                    response_data = response.json()
-                    # Process search results
-                    search_results = response_data['data']['docs']
-                    print(len(search_results))
-                    for result in search_results:
-                        collected_results.append({
-                            'url': result['url'],
-                            'title': result['title'],
-                            'description': result.get('snippet', ''),
-                            'snippets': [result.get('snippet', '')]
-                        })
-                    break  # Successfully get results, exit retry loop
-                except requests.exceptions.RequestException as e:
-                    logging.error(f'Attempt {attempt} failed for query "{query}": {e}')
-                    if attempt < self.max_retries:
-                        time.sleep(self.retry_delay)
-                except Exception as e:
-                    logging.error(f'Unexpected error for query "{query}": {e}')
-                    break  # Non-network error, exit retry loop
-        return collected_results
\ No newline at end of file
+    async def _afetch(self, client: httpx.AsyncClient, sem: asyncio.Semaphore, query: str) -> List[dict]:
+        cached = self._cache_get(query)
+        if cached is not None:
+            return cached
+        body = self._request_body(query)
+        attempt = 0
+        while attempt < self.max_retries:
+            attempt += 1
+            try:
+                async with sem:
+                    response = await client.post(self.api_endpoint, **body)
+                results = self._parse_results(response)
+                self._cache_put(query, results)
+                return results
+            except httpx.HTTPError as e:
+                logger.error('Attempt %s failed for query "%s": %s', attempt, query, e)
+                if attempt < self.max_retries:
+                    # Exponential backoff, outside the semaphore so other queries proceed
+                    await asyncio.sleep(self._retry_delay(attempt, e))
+            except Exception as e:
+                logger.error('Unexpected error for query "%s": %s', query, e)
+                break  # Non-network error, exit retry loop
+        return []
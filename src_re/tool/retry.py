@@ -0,0 +1,46 @@
+"""
+Retry backoff shared by the language model and search clients.
+
+Both clients wait with exponential backoff and jitter between attempts,
+honor server rate-limit hints, and cap every wait at the same bound.
+"""
+
+import random
+
+# Longest wait between two attempts (seconds), whatever the backoff or server asks for
+RETRY_MAX_DELAY = 30.0
+
+# Response headers carrying a server-requested wait in seconds
+RETRY_AFTER_HEADERS = ("Retry-After", "X-RateLimit-Reset-After")
+
+
+def backoff_delay(base_delay: float, error: Exception = None, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """
+    Compute how long to wait before the next attempt.
+    
+    base_delay is the un-jittered exponential backoff for this attempt. It is
+    jittered by 0.5-1.5x, raised to a Retry-After (or X-RateLimit-Reset-After)
+    header when the error carries an HTTP response, and then capped at
+    max_delay.
+    
+    Args:
+        base_delay: Exponential backoff for this attempt, in seconds
+        error: The exception raised by the failed attempt, if any
+        max_delay: Upper bound of the returned wait, in seconds
+        
+    Returns:
+        float: Seconds to wait, between 0 and max_delay
+    """
+    delay = base_delay * random.uniform(0.5, 1.5)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        for header in RETRY_AFTER_HEADERS:
+            value = headers.get(header)
+            if not value:
+                continue
+            try:
+                delay = max(delay, float(value))
+            except ValueError:
+                pass  # HTTP-date form or garbage; keep the backoff
+    return min(max_delay, max(0.0, delay))
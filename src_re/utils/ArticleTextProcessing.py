@@ -7,9 +7,36 @@ cleaning. It implements algorithms for preserving text integrity while performin
 various transformations and extractions.
 """
 
+import os
 import re
 from typing import List, Dict
 
+# Opt-in RE2 engine (google-re2, linear time) for the patterns it supports; set ARTICLE_RE2=1
+USE_RE2 = bool(os.getenv("ARTICLE_RE2"))
+_re = re
+if USE_RE2:
+    try:
+        import re2 as _re
+    except ImportError:
+        USE_RE2 = False
+
+# Patterns compiled once at import
+_CITATION_RE = _re.compile(r'\[\d+(?:,\s*\d+)*\]')
+_CITE_SINGLE_RE = _re.compile(r'\[\d+\]')
+_CITE_GROUP_RE = _re.compile(r'\[([0-9, ]+)\]')
+_CITE_SEQ_RE = _re.compile(r'(\[\d+\])+')
+_EOS_RE = _re.compile(r'([.!?])\s*(\[\d+\])?\s*')
+_REF_NUM_RE = _re.compile(r'\[(\d+)\]')
+# LLM error notes that clean_up_outline does not turn into headings
+_ERROR_LINE_RE = re.compile(r'error|failed|出错', re.IGNORECASE)
+# Reference-like sections dropped by clean_up_outline, up to the next "##" or the end.
+# Uses a lookahead, which RE2 does not support, so it stays on re.
+_STRIP_SECTIONS_RE = re.compile(
+    r"#[#]? (?:See [Aa]lso|Notes|References|External [Ll]inks|Bibliography|Further [Rr]eading"
+    r"|Summary|Appendices|Appendix).*?(?=##|$)",
+    re.DOTALL
+)
+
 class ArticleTextProcessing:
     """
     Text processing utilities for article content manipulation.
@@ -38,23 +65,19 @@ class ArticleTextProcessing:
             str: The truncated string with word count limited to `max_word_count`, preserving complete lines.
         """
 
-        word_count = 0
-        limited_string = ''
+        output_lines = []
+        remaining = max_word_count
 
-        # Process text line by line to maintain line integrity
-        for word in input_string.split('\n'):
-            line_words = word.split()
-            for lw in line_words:
-                if word_count < max_word_count:
-                    limited_string += lw + ' '
-                    word_count += 1
-                else:
-                    break
-            if word_count >= max_word_count:
+        # Process text line by line to maintain line integrity; blank lines are dropped
+        for line in input_string.split('\n'):
+            if remaining <= 0:
                 break
-            limited_string = limited_string.strip() + '\n'
+            line_words = line.split()[:remaining]
+            if line_words:
+                output_lines.append(' '.join(line_words))
+                remaining -= len(line_words)
 
-        return limited_string.strip()
+        return '\n'.join(output_lines)
 
     @staticmethod
     def remove_citations(s):
@@ -71,8 +94,10 @@ class ArticleTextProcessing:
         Returns:
             str: The string with all citation patterns removed.
         """
-
-        return re.sub(r'\[\d+(?:,\s*\d+)*\]', '', s)
+        # Text without brackets cannot hold a citation; skip the regex engine
+        if '[' not in s:
+            return s
+        return _CITATION_RE.sub('', s)
 
     @staticmethod
     def get_first_section_dict_and_list(s):
@@ -121,7 +146,7 @@ class ArticleTextProcessing:
         Returns:
             List[int]: A list of unique citation indexes extracted from the content, in the order they appear.
         """
-        matches = re.findall(r'\[\d+\]', s)
+        matches = _CITE_SINGLE_RE.findall(s)
         return [int(index[1:-1]) for index in matches]
 
     @staticmethod
@@ -148,38 +173,46 @@ class ArticleTextProcessing:
 
         # Deduplicate and sort individual groups of citations.
         def deduplicate_group(match):
-            citations = match.group(0)
-            unique_citations = list(set(re.findall(r'\[\d+\]', citations)))
-            sorted_citations = sorted(unique_citations, key=lambda x: int(x.strip('[]')))
+            numbers = sorted(set(_REF_NUM_RE.findall(match.group(0))), key=int)
             # Return the sorted unique citations as a string
-            return ''.join(sorted_citations)
+            return ''.join(f'[{n}]' for n in numbers)
 
-        text = re.sub(r'\[([0-9, ]+)\]', replace_with_individual_brackets, text)
-        text = re.sub(r'(\[\d+\])+', deduplicate_group, text)
+        # Paragraphs without citations skip both citation passes
+        if '[' in text:
+            text = _CITE_GROUP_RE.sub(replace_with_individual_brackets, text)
+            text = _CITE_SEQ_RE.sub(deduplicate_group, text)
 
-        eos_pattern = r'([.!?])\s*(\[\d+\])?\s*'
-        matches = list(re.finditer(eos_pattern, text))
-        if matches:
-            last_match = matches[-1]
-            text = text[:last_match.end()].strip()
+        # Only the end of the last sentence is needed; keep the position, not every match
+        end = -1
+        for match in _EOS_RE.finditer(text):
+            end = match.end()
+        if end > 0:
+            text = text[:end].strip()
 
         return text
 
     @staticmethod
     def clean_up_citation(conv):
         for turn in conv.dlg_history:
-            turn.agent_utterance = turn.agent_utterance[:turn.agent_utterance.find('References:')]
-            turn.agent_utterance = turn.agent_utterance[:turn.agent_utterance.find('Sources:')]
-            turn.agent_utterance = turn.agent_utterance.replace('Answer:', '').strip()
-            try:
-                max_ref_num = max([int(x) for x in re.findall(r'\[(\d+)\]', turn.agent_utterance)])
-            except Exception as e:
-                max_ref_num = 0
-            if max_ref_num > len(turn.search_results):
-                for i in range(len(turn.search_results), max_ref_num + 1):
-                    turn.agent_utterance = turn.agent_utterance.replace(f'[{i}]', '')
-            turn.agent_utterance = ArticleTextProcessing.remove_uncompleted_sentences_with_citations(
-                turn.agent_utterance)
+            utterance = turn.agent_utterance
+            # Cut off trailing reference lists; a missing marker leaves the text untouched
+            for marker in ('References:', 'Sources:'):
+                idx = utterance.find(marker)
+                if idx != -1:
+                    utterance = utterance[:idx]
+            utterance = utterance.replace('Answer:', '').strip()
+
+            num_results = len(turn.search_results)
+            max_ref_num = max((int(x) for x in _REF_NUM_RE.findall(utterance)), default=0)
+            if max_ref_num > num_results:
+                # Drop citations [num_results]..[max_ref_num], which point past the search results, in one pass
+                def drop_out_of_range(match):
+                    number = match.group(1)
+                    if int(number) >= num_results and str(int(number)) == number:
+                        return ''
+                    return match.group(0)
+                utterance = _REF_NUM_RE.sub(drop_out_of_range, utterance)
+            turn.agent_utterance = ArticleTextProcessing.remove_uncompleted_sentences_with_citations(utterance)
 
         return conv
         
@@ -191,11 +224,12 @@ class ArticleTextProcessing:
         output_lines = []
         current_level = 0
         has_valid_outline = False
+        topic_heading = f"# {topic.lower()}" if topic != "" else None
 
         for line in outline.split('\n'):
             stripped_line = line.strip()
 
-            if topic != "" and f"# {topic.lower()}" in stripped_line.lower():
+            if topic_heading is not None and topic_heading in stripped_line.lower():
                 output_lines = []
 
             if stripped_line.startswith('#') and stripped_line != '#':
@@ -203,7 +237,7 @@ class ArticleTextProcessing:
                 output_lines.append(stripped_line)
                 has_valid_outline = True
             elif stripped_line and not has_valid_outline and not stripped_line.startswith('@'):
-                if "error" in stripped_line.lower() or "failed" in stripped_line.lower() or "出错" in stripped_line:
+                if _ERROR_LINE_RE.search(stripped_line):
                     continue
                 else:
                     output_lines.append("# " + stripped_line)
@@ -217,18 +251,7 @@ class ArticleTextProcessing:
         outline = '\n'.join(output_lines)
 
         # Remove references.
-        outline = re.sub(r"#[#]? See also.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? See Also.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? Notes.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? References.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? External links.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? External Links.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? Bibliography.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? Further reading*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? Further Reading*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? Summary.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? Appendices.*?(?=##|$)", '', outline, flags=re.DOTALL)
-        outline = re.sub(r"#[#]? Appendix.*?(?=##|$)", '', outline, flags=re.DOTALL)
+        outline = _STRIP_SECTIONS_RE.sub('', outline)
 
         if not outline.strip():
             return "# Introduction\n# Main Content\n# Conclusion"
@@ -269,12 +292,9 @@ class ArticleTextProcessing:
     @staticmethod
     def update_citation_index(s, citation_map):
         """Update citation index in the string based on the citation map."""
-        for original_citation in citation_map:
-            s = s.replace(f"[{original_citation}]", f"__PLACEHOLDER_{original_citation}__")
-        for original_citation, unify_citation in citation_map.items():
-            s = s.replace(f"__PLACEHOLDER_{original_citation}__", f"[{unify_citation}]")
-
-        return s
+        # One pass, so a rewritten citation is never matched again by another map entry
+        replacements = {str(original): f"[{unified}]" for original, unified in citation_map.items()}
+        return _REF_NUM_RE.sub(lambda m: replacements.get(m.group(1), m.group(0)), s)
 
     @staticmethod
     def parse_article_into_dict(input_string):
@@ -297,26 +317,37 @@ class ArticleTextProcessing:
             A dictionary representing contains the section title as the key, and another dictionary
         as the value, which includes the 'content' and 'subsections' keys as described above.
         """
-        lines = input_string.split('\n')
-        lines = [line for line in lines if line.strip()]
         root = {'content': '', 'subsections': {}}
-        current_path = [(root, -1)]
+        # Parallel stacks of the open sections, their levels and their content lines
+        nodes, levels, contents = [root], [-1], [[]]
+        sections = []
 
-        for line in lines:
+        for line in input_string.split('\n'):
+            if not line.strip():
+                continue
             if line.startswith('#'):
                 level = line.count('#')
                 title = line.strip('# ').strip()
                 new_section = {'content': '', 'subsections': {}}
 
                 # Pop from stack until find the parent level
-                while current_path and current_path[-1][1] >= level:
-                    current_path.pop()
+                while levels[-1] >= level:
+                    nodes.pop()
+                    levels.pop()
+                    contents.pop()
 
                 # Append new section to the nearest upper level's subsections
-                current_path[-1][0]['subsections'][title] = new_section
-                current_path.append((new_section, level))
+                nodes[-1]['subsections'][title] = new_section
+                nodes.append(new_section)
+                levels.append(level)
+                contents.append([])
+                sections.append((new_section, contents[-1]))
             else:
-                current_path[-1][0]['content'] += line + '\n'
+                contents[-1].append(line + '\n')
+
+        # Join each section's content once instead of concatenating line by line
+        for section, lines in sections:
+            section['content'] = ''.join(lines)
 
         return root['subsections']
 
@@ -337,12 +368,18 @@ class ArticleTextProcessing:
                 {"title": "Child2", "level": 2}
             ]
         """
-        lines = [line.strip() for line in markdown.split('\n') if line.strip()]
         parsed = []
-        for line in lines:
-            match = re.match(r'^(#+)\s+(.+?)\s*$', line)
-            if match:
-                level = len(match.group(1))
-                title = match.group(2).strip()
+        for line in markdown.split('\n'):
+            line = line.strip()
+            # Most lines of a long document are not headings
+            if not line.startswith('#'):
+                continue
+            level = len(line) - len(line.lstrip('#'))
+            heading = line[level:]
+            # A heading needs whitespace after the '#'s and a non-empty title
+            if not heading[:1].isspace():
+                continue
+            title = heading.strip()
+            if title:
                 parsed.append({"title": title, "level": level})
         return parsed
\ No newline at end of file